@@ -45,10 +45,11 @@ def create_app():
     logging.getLogger('httpx').setLevel(logging.WARNING)
 
     # Import and register blueprints
-    from .blueprints import barcode
+    from .blueprints import barcode, jobs
 
     # Register blueprints
     app.register_blueprint(barcode.bp, url_prefix='/')
+    app.register_blueprint(jobs.bp, url_prefix='/')
     
     # Add request logging
     @app.before_request
@@ -139,6 +140,31 @@ def create_app():
                 "method": "GET",
                 "path": "/barcode?data=<data>&type=<type>&raw=<true/false>",
                 "description": "Generate a barcode image. Types: code128, ean8, ean13, etc."
+            },
+            {
+                "method": "GET",
+                "path": "/barcode/variants?data=<data>&variants=1x,2x,600dpi",
+                "description": "Generate one barcode at several sizes from a single encode"
+            },
+            {
+                "method": "GET",
+                "path": "/barcode/metrics",
+                "description": "Render work dropped at request deadlines"
+            },
+            {
+                "method": "POST",
+                "path": "/jobs",
+                "description": "Submit a large batch of barcodes to render in the background"
+            },
+            {
+                "method": "GET",
+                "path": "/jobs/<job_id>",
+                "description": "Job status and progress (DELETE cancels the job)"
+            },
+            {
+                "method": "GET",
+                "path": "/jobs/<job_id>/result",
+                "description": "Download the zip archive of a completed job"
             }
         ]
 
@@ -9,6 +9,7 @@ import sys
 import re
 import os
 import inspect
+import traceback
 from datetime import datetime
 from flask import request
 
@@ -132,8 +133,9 @@ def log(message, level="INFO", **kwargs):
         level: Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         **kwargs: Additional arguments (extra is used for structured logging)
     """
-    # Remove 'extra' from kwargs to prevent passing it to print()
+    # Remove 'extra' and 'exc_info' from kwargs to prevent passing them to print()
     extra = kwargs.pop('extra', {})
+    exc_info = kwargs.pop('exc_info', False)
     
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     client_ip = get_client_ip()
@@ -152,6 +154,10 @@ def log(message, level="INFO", **kwargs):
     # Print the formatted message
     print(" ".join(log_parts), file=output, **kwargs)
     
+    # Include the traceback of the exception being handled, like logging does
+    if exc_info and sys.exc_info()[0] is not None:
+        traceback.print_exc(file=output)
+    
     # # If we have extra data and not in a request context (to avoid recursion)
     # if extra and 'request' not in extra:
     #     import json
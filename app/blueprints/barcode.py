@@ -1,24 +1,67 @@
-from flask import Blueprint, request, jsonify, make_response, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, g
+import os
+import time
+import struct
 import barcode
-from barcode.writer import ImageWriter
+from barcode.writer import ImageWriter, SVGWriter
 from io import BytesIO
 import base64
 from datetime import datetime
 from .. import SimpleLogger
+from ..compression import ResponseCompressor
+from ..pattern import PatternWriter
+from ..code128 import OptimalCode128
+from ..cache import LRUCache, cache_key
+from ..options import parse_writer_options
+from ..brownout import BrownoutController
+from ..variants import LayoutWriter, normalize_descriptors, parse_descriptor
+from ..compositing import TemplateCompositor
+from ..deadline import Deadline, DeadlineExceeded, claim_deadline, deadline_metrics, TIMEOUT_HEADER, TOKEN_HEADER
 
 # Create blueprint
 bp = Blueprint('barcode', __name__)
 
+class RenderUnavailable(Exception):
+    """Raised when a render is skipped because the server is overloaded."""
+
 class BarcodeGenerator:
     """Handles barcode generation and validation."""
     
     # Supported barcode types
     SUPPORTED_TYPES = ['code128', 'ean8', 'ean13', 'ean', 'upc', 'isbn10', 'isbn13', 'issn', 'code39']
     
+    # Supported output formats
+    SUPPORTED_FORMATS = ['png', 'pattern']
+    
+    # Encoders used instead of python-barcode's own classes
+    BARCODE_CLASSES = {
+        'code128': OptimalCode128,
+    }
+    
+    # Limits for the variants endpoint
+    MAX_VARIANTS = 8
+    MAX_VARIANT_DPI = 1200
+    
+    # zlib level used for PNG output while degraded (1 is fastest)
+    DEGRADED_ZLIB_LEVEL = int(os.environ.get('BROWNOUT_ZLIB_LEVEL', 1))
+    
     def __init__(self):
         self.logger = SimpleLogger(self.__class__.__name__)
+        # Rendered PNGs keyed by the canonical (type, data, options) key
+        self.cache = LRUCache(
+            max_entries=int(os.environ.get('RENDER_CACHE_SIZE', 1024)),
+            max_bytes=int(os.environ.get('RENDER_CACHE_BYTES', 64 * 1024 * 1024))
+        )
+        # Per-option templates for EAN/UPC/ISBN rendering
+        self.compositor = TemplateCompositor()
     
-    def validate_request(self, data, barcode_type):
+    def get_barcode_class(self, barcode_type):
+        """Return the barcode class used to encode barcode_type."""
+        if barcode_type in self.BARCODE_CLASSES:
+            return self.BARCODE_CLASSES[barcode_type]
+        return barcode.get_barcode_class(barcode_type)
+    
+    def validate_request(self, data, barcode_type, output_format='png'):
         """Validate barcode generation request parameters.
         
         Returns:
@@ -42,17 +85,31 @@ class BarcodeGenerator:
                 "supported_types": self.SUPPORTED_TYPES
             }, 400, False)
             
+        if output_format not in self.SUPPORTED_FORMATS:
+            error_msg = f"Unsupported output format: {output_format}"
+            self.logger.error(error_msg)
+            return False, ({
+                "error": error_msg,
+                "supported_formats": self.SUPPORTED_FORMATS
+            }, 400, False)
+            
         return True, (None, None, False)
         
         return True, (None, None)
     
-    def generate_barcode(self, data, barcode_type='code128', raw=False, **writer_options):
+    def generate_barcode(self, data, barcode_type='code128', raw=False, degraded=False, deadline=None, **writer_options):
         """Generate a barcode with the given data and type.
         
         Args:
             data: The data to encode in the barcode
             barcode_type: Type of barcode to generate (default: code128)
             raw: If True, returns raw image data
+            degraded: If True, render cheaply (no text, bilevel, fast zlib) and
+                      serve JSON only from the cache, raising RenderUnavailable
+                      on a miss
+            deadline: Deadline checked before rendering and encoding a PNG
+                      that isn't cached; raises DeadlineExceeded once it has
+                      passed or the client has disconnected
             **writer_options: Additional options for the barcode writer:
                 - module_width: Width of a single module (default: 0.2)
                 - module_height: Height of a single module (default: 15.0)
@@ -70,76 +127,372 @@ class BarcodeGenerator:
         self.logger.info(f"Generating {barcode_type} barcode for data: {data}")
         
         try:
-            # Get barcode class
-            barcode_class = barcode.get_barcode_class(barcode_type)
-            self.logger.debug(f"Using barcode class: {barcode_class.__name__}")
+            content = self.cache.get(cache_key(barcode_type, data, writer_options, False))
             
-            # Set up writer with options
-            writer = ImageWriter()
-            
-            # Set writer options
-            for key, value in writer_options.items():
-                if hasattr(writer, key):
-                    setattr(writer, key, value)
-            
-            # Generate barcode
-            barcode_instance = barcode_class(data, writer=writer)
-            
-            # Add guard bars for EAN/UPC barcodes if requested
-            if writer_options.get('guardbar', False) and barcode_type in ['ean8', 'ean13', 'ean', 'upc', 'upca']:
-                # For EAN13, we need to use the renderer to add guard bars
-                if barcode_type == 'ean13':
-                    from barcode.ean import EAN13
-                    if isinstance(barcode_instance, EAN13):
-                        guardbar_height = float(writer_options.get('guardbar_height', 1.0))
-                        # Get the renderer and set guard bar height
-                        renderer = barcode_instance.writer
-                        renderer.guardbar_height = guardbar_height
-                        self.logger.debug(f"Set guard bar height to {guardbar_height} for EAN13")
-                elif hasattr(barcode_instance, 'add_guard_bar'):
-                    # For other barcode types that support add_guard_bar
-                    guardbar_height = float(writer_options.get('guardbar_height', 1.0))
-                    barcode_instance.add_guard_bar(guardbar_height)
-                    self.logger.debug(f"Added guard bars with height factor: {guardbar_height}")
-                else:
-                    self.logger.warning(f"Guard bars not supported for barcode type: {barcode_type}")
+            if content is None and degraded:
+                # Cheaper settings: skip font rendering entirely
+                writer_options = dict(writer_options, write_text=False)
+                content = self.cache.get(cache_key(barcode_type, data, writer_options, True))
+                if content is None and not raw:
+                    raise RenderUnavailable("Server is overloaded, only cached barcodes are served as JSON")
+            else:
+                degraded = False
             
-            # Save to bytes buffer
-            buffer = BytesIO()
-            barcode_instance.write(buffer, writer_options)
-            
-            # Convert to base64
-            b64_barcode = base64.b64encode(buffer.getvalue()).decode('utf-8')
+            if content is None:
+                content = self._render_png(data, barcode_type, degraded, writer_options, deadline)
+                self.cache.set(cache_key(barcode_type, data, writer_options, degraded), content)
             
             self.logger.info(f"Successfully generated {barcode_type} barcode")
             
             if raw:
                 self.logger.debug("Returning raw image response")
                 return {
-                    'content': buffer.getvalue(),
+                    'content': content,
                     'content_type': 'image/png',
-                    'filename': f'barcode_{barcode_type}.png'
+                    'filename': f'barcode_{barcode_type}.png',
+                    'degraded': degraded
                 }
             
-            # Include writer options in response
+            # Include writer options in response; base64 is only needed here
             response = {
                 'barcode_type': barcode_type,
                 'data': data,
-                'barcode': f"data:image/png;base64,{b64_barcode}",
+                'barcode': data_uri(content),
                 'generated_at': datetime.utcnow().isoformat(),
-                'options': writer_options
+                'options': writer_options,
+                'degraded': degraded
             }
             
             return response
             
+        except RenderUnavailable:
+            self.logger.warning(f"Skipped uncached {barcode_type} barcode during brownout")
+            raise
+        except DeadlineExceeded as e:
+            self.logger.warning(f"Dropped {barcode_type} barcode: {e}")
+            raise
         except Exception as e:
             error_msg = f"Error generating {barcode_type} barcode: {str(e)}"
             self.logger.error(error_msg, exc_info=True)
             raise
+    
+    def render_png(self, data, barcode_type='code128', **writer_options):
+        """Render a barcode to PNG bytes, bypassing the render cache.
+        
+        For one-off renders such as batch jobs, which would only push
+        interactive barcodes out of the cache. Nothing is logged on failure;
+        errors are left to the caller.
+        
+        Args:
+            data: The data to encode in the barcode
+            barcode_type: Type of barcode to generate (default: code128)
+            **writer_options: Same options as generate_barcode
+        
+        Returns:
+            bytes: The PNG image
+        """
+        return self._render_png(data, barcode_type, False, writer_options)
+    
+    def _render_png(self, data, barcode_type, degraded, writer_options, deadline=None):
+        """Render a barcode to PNG bytes."""
+        if deadline is not None:
+            deadline.check('render')
+        start = time.perf_counter()
+        
+        # Get barcode class
+        barcode_class = self.get_barcode_class(barcode_type)
+        self.logger.debug(f"Using barcode class: {barcode_class.__name__}")
+        
+        # Set up writer with options; bilevel output is cheaper to draw and encode
+        if degraded:
+            writer = ImageWriter(mode='1')
+            # Pillow maps every colour but black to white in mode '1', which
+            # would blank a coloured barcode: draw it in black on white
+            writer_options = dict(writer_options, foreground='black', background='white')
+        else:
+            writer = ImageWriter()
+        
+        # Set writer options
+        for key, value in writer_options.items():
+            if hasattr(writer, key):
+                setattr(writer, key, value)
+        
+        # Generate barcode
+        barcode_instance = barcode_class(data, writer=writer)
+        
+        if self.compositor.supports(barcode_type, writer_options):
+            # Fixed-layout retail codes are composited from a per-option template
+            image = self.compositor.render(barcode_type, barcode_instance, writer_options)
+            return self._encode_png(image, barcode_instance.writer, degraded, start, deadline)
+        
+        # Add guard bars for EAN/UPC barcodes if requested
+        if writer_options.get('guardbar', False) and barcode_type in ['ean8', 'ean13', 'ean', 'upc', 'upca']:
+            # For EAN13, we need to use the renderer to add guard bars
+            if barcode_type == 'ean13':
+                from barcode.ean import EAN13
+                if isinstance(barcode_instance, EAN13):
+                    guardbar_height = float(writer_options.get('guardbar_height', 1.0))
+                    # Get the renderer and set guard bar height
+                    renderer = barcode_instance.writer
+                    renderer.guardbar_height = guardbar_height
+                    self.logger.debug(f"Set guard bar height to {guardbar_height} for EAN13")
+            elif hasattr(barcode_instance, 'add_guard_bar'):
+                # For other barcode types that support add_guard_bar
+                guardbar_height = float(writer_options.get('guardbar_height', 1.0))
+                barcode_instance.add_guard_bar(guardbar_height)
+                self.logger.debug(f"Added guard bars with height factor: {guardbar_height}")
+            else:
+                self.logger.warning(f"Guard bars not supported for barcode type: {barcode_type}")
+        
+        image = barcode_instance.render(writer_options)
+        return self._encode_png(image, barcode_instance.writer, degraded, start, deadline)
+    
+    def _encode_png(self, image, writer, degraded, start, deadline=None):
+        """Encode a rendered barcode image as PNG bytes."""
+        # PNG encoding is the costliest step; skip it if nobody is waiting
+        if deadline is not None:
+            deadline.check('encode')
+        painted = time.perf_counter()
+        
+        # Save to bytes buffer
+        buffer = BytesIO()
+        if degraded:
+            image.save(buffer, format='PNG', compress_level=self.DEGRADED_ZLIB_LEVEL)
+        else:
+            writer.write(image, buffer)
+        
+        deadline_metrics.record_render((painted - start) * 1000, (time.perf_counter() - painted) * 1000)
+        return buffer.getvalue()
+    
+    def generate_variants(self, data, barcode_type='code128', descriptors=('1x',), degraded=False, deadline=None, **writer_options):
+        """Generate one barcode at several sizes from a single encode.
+        
+        The barcode is encoded and laid out once; each variant is then
+        rasterized directly at its own pixel density. Variants are cached
+        like single barcodes and, as JSON, follow the same brownout rule:
+        while degraded they are served only from the cache.
+        
+        Args:
+            data: The data to encode in the barcode
+            barcode_type: Type of barcode to generate (default: code128)
+            descriptors: srcset-style sizes, '<n>x' (n times the default size)
+                         or '<n>dpi' (default size at n DPI)
+            degraded: If True, serve the variants only from the cache,
+                      raising RenderUnavailable if any of them is missing
+            deadline: Deadline checked before each variant is rasterized
+            **writer_options: Same options as generate_barcode
+        
+        Raises:
+            ValueError: If a descriptor is invalid or out of range
+            RenderUnavailable: If degraded and a variant isn't cached
+            DeadlineExceeded: If the deadline passes or the client disconnects
+        """
+        self.logger.info(f"Generating {len(descriptors)} {barcode_type} variants for data: {data}")
+        
+        variants = []
+        for descriptor in normalize_descriptors(descriptors):
+            scale, dpi = parse_descriptor(descriptor)
+            if not 0 < scale * dpi <= self.MAX_VARIANT_DPI:
+                raise ValueError(f"Variant {descriptor} exceeds {self.MAX_VARIANT_DPI} DPI")
+            variants.append((descriptor, scale, dpi))
+        
+        try:
+            # Keyed by what is drawn, so '2x' and '2.0x' share an entry
+            keys = [cache_key(barcode_type, data, writer_options, 'variant', scale, dpi) for _, scale, dpi in variants]
+            contents = [self.cache.get(key) for key in keys]
+            
+            if None in contents and degraded:
+                raise RenderUnavailable("Server is overloaded, only cached barcode variants are served")
+            
+            layout = None
+            results = []
+            for (descriptor, scale, dpi), key, content in zip(variants, keys, contents):
+                if content is None:
+                    if layout is None:
+                        barcode_class = self.get_barcode_class(barcode_type)
+                        layout = barcode_class(data, writer=LayoutWriter()).render(writer_options)
+                    if deadline is not None:
+                        deadline.check('render')
+                    image = layout.rasterize(dpi, scale)
+                    buffer = BytesIO()
+                    image.save(buffer, format='PNG', dpi=(dpi, dpi))
+                    content = buffer.getvalue()
+                    self.cache.set(key, content)
+                width, height = png_size(content)
+                results.append({
+                    'descriptor': descriptor,
+                    'scale': scale,
+                    'dpi': dpi,
+                    'width': width,
+                    'height': height,
+                    'barcode': data_uri(content)
+                })
+            
+            self.logger.info(f"Successfully generated {barcode_type} variants")
+            
+            return {
+                'barcode_type': barcode_type,
+                'data': data,
+                'variants': results,
+                'generated_at': datetime.utcnow().isoformat(),
+                'options': writer_options,
+                'degraded': False
+            }
+            
+        except RenderUnavailable:
+            self.logger.warning(f"Skipped uncached {barcode_type} variants during brownout")
+            raise
+        except DeadlineExceeded as e:
+            self.logger.warning(f"Dropped {barcode_type} variants: {e}")
+            raise
+        except Exception as e:
+            error_msg = f"Error generating {barcode_type} variants: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            raise
+    
+    def generate_svg(self, data, barcode_type='code128', deadline=None, **writer_options):
+        """Generate a barcode as compact SVG bytes.
+        
+        Args:
+            data: The data to encode in the barcode
+            barcode_type: Type of barcode to generate (default: code128)
+            deadline: Deadline checked before rendering an uncached SVG
+            **writer_options: Same options as generate_barcode
+        """
+        key = cache_key(barcode_type, data, writer_options, 'svg')
+        content = self.cache.get(key)
+        if content is None:
+            if deadline is not None:
+                deadline.check('render')
+            writer = SVGWriter()
+            # Unindented output without doctype keeps frames small
+            writer.compress = True
+            writer.with_doctype = False
+            content = self.get_barcode_class(barcode_type)(data, writer=writer).render(writer_options)
+            self.cache.set(key, content)
+        return content
+    
+    def generate_pattern(self, data, barcode_type='code128', **writer_options):
+        """Generate the run-length encoded module pattern for client-side rendering.
+        
+        Uses the same writer options as generate_barcode, but no image is
+        rasterized: the response carries the module runs, the human readable
+        text positions and the geometry needed to draw the barcode.
+        
+        Args:
+            data: The data to encode in the barcode
+            barcode_type: Type of barcode to generate (default: code128)
+            **writer_options: Same options as generate_barcode
+        """
+        self.logger.info(f"Generating {barcode_type} pattern for data: {data}")
+        
+        try:
+            barcode_class = self.get_barcode_class(barcode_type)
+            barcode_instance = barcode_class(data, writer=PatternWriter())
+            pattern = barcode_instance.render(writer_options)
+            
+            self.logger.info(f"Successfully generated {barcode_type} pattern")
+            
+            return {
+                'barcode_type': barcode_type,
+                'data': data,
+                'format': 'pattern',
+                'pattern': pattern,
+                'generated_at': datetime.utcnow().isoformat(),
+                'options': writer_options
+            }
+            
+        except Exception as e:
+            error_msg = f"Error generating {barcode_type} pattern: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            raise
+
+def data_uri(content, content_type='image/png'):
+    """Encode image bytes as a base64 data URI.
+    
+    The prefix is joined to the base64 bytes before the single decode to
+    str, so at most two copies of the encoded image are alive at once.
+    
+    Args:
+        content: The encoded image
+        content_type: MIME type of the image (default: image/png)
+    
+    Returns:
+        str: 'data:<content_type>;base64,...'
+    """
+    return (b'data:' + content_type.encode('ascii') + b';base64,' + base64.b64encode(content)).decode('ascii')
+
+def png_size(content):
+    """Return the (width, height) of PNG bytes from their IHDR chunk."""
+    return struct.unpack('>II', content[16:24])
+
+def image_response(content, content_type, filename=None):
+    """Build a response that hands the encoded image to the server as-is.
+    
+    The bytes object is passed through by reference without being iterated
+    or re-encoded by werkzeug, and Content-Length is known up front.
+    
+    Args:
+        content: The encoded image (bytes)
+        content_type: MIME type of the image
+        filename: Attachment filename (default: shown inline)
+    
+    Returns:
+        flask.Response: The response
+    """
+    response = Response([content], content_type=content_type, direct_passthrough=True)
+    response.headers.set('Content-Length', str(len(content)))
+    if filename:
+        response.headers.set('Content-Disposition', f'attachment; filename={filename}')
+    return response
 
 # Create instance of BarcodeGenerator
 barcode_generator = BarcodeGenerator()
 
+# Shared compressor so compressed variants are reused across requests
+response_compressor = ResponseCompressor()
+
+# Per-process overload detection for the barcode routes
+brownout = BrownoutController()
+
+@bp.before_request
+def track_request_start():
+    """Count the request as in flight for brownout control."""
+    g.brownout_start = time.perf_counter()
+    brownout.request_started()
+
+@bp.before_request
+def start_deadline():
+    """Pick up the request's deadline and drop it if it expired while queued."""
+    token = request.headers.get(TOKEN_HEADER)
+    g.deadline = (token and claim_deadline(token)) or Deadline.from_header(request.headers.get(TIMEOUT_HEADER))
+    g.deadline.check('queue')
+
+@bp.errorhandler(DeadlineExceeded)
+def deadline_exceeded(e):
+    """Answer requests dropped at a deadline checkpoint."""
+    return jsonify({"error": str(e), "stage": e.stage}), e.status_code
+
+@bp.teardown_request
+def track_request_end(exc):
+    """Feed the request latency back to brownout control."""
+    start = g.pop('brownout_start', None)
+    if start is not None:
+        brownout.request_finished((time.perf_counter() - start) * 1000)
+
+@bp.after_request
+def compress_response(response):
+    """Negotiate compression for barcode and form responses."""
+    return response_compressor.compress_response(response, request.accept_encodings)
+
+def overloaded_response(error):
+    """Answer a render skipped during brownout, asking the client to retry later."""
+    response = jsonify({"error": str(error), "degraded": True})
+    response.status_code = 503
+    response.headers.set('Retry-After', str(int(brownout.min_duration)))
+    response.headers.set('X-Barcode-Degraded', 'true')
+    return response
+
 @bp.route('/barcode', methods=['GET'])
 def generate_barcode():
     """Endpoint to generate barcode.
@@ -148,6 +501,8 @@ def generate_barcode():
         data (required): The data to encode in the barcode
         type: Type of barcode (default: code128)
         raw: Return raw image if 'true' (default: false)
+        format: 'png' or 'pattern' for the run-length encoded module
+                sequence used by client-side renderers (default: png)
         
         # Writer options
         module_width: Width of a single module (default: 0.2)
@@ -167,38 +522,13 @@ def generate_barcode():
     data = request.args.get('data')
     barcode_type = request.args.get('type', 'code128').lower()
     raw = request.args.get('raw', 'false').lower() == 'true'
+    output_format = request.args.get('format', 'png').lower()
     
     # Get writer options
-    writer_options = {}
-    float_params = ['module_width', 'module_height', 'quiet_zone', 'text_distance']
-    int_params = ['font_size']
-    bool_params = ['write_text', 'center_text', 'guardbar']
-    color_params = ['background', 'foreground']
-    float_params += ['guardbar_height']
-    
-    # Process writer options
-    for param in request.args:
-        if param in float_params + int_params + bool_params + color_params + ['text']:
-            value = request.args.get(param)
-            
-            # Convert to appropriate type
-            if param in float_params:
-                try:
-                    writer_options[param] = float(value)
-                except (ValueError, TypeError):
-                    pass
-            elif param in int_params:
-                try:
-                    writer_options[param] = int(value)
-                except (ValueError, TypeError):
-                    pass
-            elif param in bool_params:
-                writer_options[param] = value.lower() == 'true'
-            else:  # color params or text
-                writer_options[param] = value
+    writer_options = parse_writer_options(request.args)
     
     # Validate request
-    is_valid, (error_response, status_code, show_form) = barcode_generator.validate_request(data, barcode_type)
+    is_valid, (error_response, status_code, show_form) = barcode_generator.validate_request(data, barcode_type, output_format)
     
     # If we should show the form (no data provided)
     if show_form:
@@ -209,17 +539,82 @@ def generate_barcode():
         return jsonify(error_response), status_code
     
     try:
-        result = barcode_generator.generate_barcode(data, barcode_type, raw, **writer_options)
+        if output_format == 'pattern':
+            return jsonify(barcode_generator.generate_pattern(data, barcode_type, **writer_options))
+        
+        result = barcode_generator.generate_barcode(
+            data, barcode_type, raw, degraded=brownout.is_degraded(), deadline=g.deadline, **writer_options
+        )
         
         if raw:
-            response = make_response(result['content'])
-            response.headers.set('Content-Type', result['content_type'])
-            response.headers.set('Content-Disposition', f'attachment; filename={result["filename"]}')
-            return response
-            
-        return jsonify(result)
+            response = image_response(result['content'], result['content_type'], result['filename'])
+        else:
+            response = jsonify(result)
+        
+        if result['degraded']:
+            response.headers.set('X-Barcode-Degraded', 'true')
+        return response
+        
+    except RenderUnavailable as e:
+        return overloaded_response(e)
+        
+    except DeadlineExceeded:
+        raise
         
     except Exception as e:
         error_msg = f"Error generating barcode: {str(e)}"
         barcode_generator.logger.error(error_msg, exc_info=True)
         return jsonify({"error": error_msg}), 500
+
+@bp.route('/barcode/variants', methods=['GET'])
+def generate_variants():
+    """Endpoint to generate one barcode at several sizes.
+    
+    Query Parameters:
+        data (required): The data to encode in the barcode
+        type: Type of barcode (default: code128)
+        variants: Comma separated srcset-style sizes, '<n>x' for n times the
+                  default size or '<n>dpi' for the default size at n DPI
+                  (default: 1x)
+        
+        Writer options are the same as for /barcode.
+    """
+    data = request.args.get('data')
+    barcode_type = request.args.get('type', 'code128').lower()
+    descriptors = normalize_descriptors(request.args.get('variants', '1x').split(','))
+    writer_options = parse_writer_options(request.args)
+    
+    if not data:
+        return jsonify({"error": "Missing required parameter 'data'"}), 400
+    
+    is_valid, (error_response, status_code, show_form) = barcode_generator.validate_request(data, barcode_type)
+    if error_response is not None:
+        return jsonify(error_response), status_code
+    
+    if not descriptors or len(descriptors) > BarcodeGenerator.MAX_VARIANTS:
+        return jsonify({"error": f"Between 1 and {BarcodeGenerator.MAX_VARIANTS} variants can be requested"}), 400
+    
+    try:
+        result = barcode_generator.generate_variants(
+            data, barcode_type, descriptors, degraded=brownout.is_degraded(), deadline=g.deadline, **writer_options
+        )
+    except RenderUnavailable as e:
+        return overloaded_response(e)
+    except DeadlineExceeded:
+        raise
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        error_msg = f"Error generating barcode variants: {str(e)}"
+        barcode_generator.logger.error(error_msg, exc_info=True)
+        return jsonify({"error": error_msg}), 500
+    
+    response = jsonify(result)
+    if result['degraded']:
+        response.headers.set('X-Barcode-Degraded', 'true')
+    return response
+
+@bp.route('/barcode/metrics', methods=['GET'])
+def metrics():
+    """Endpoint reporting render work dropped at deadline checkpoints."""
+    return jsonify({"deadlines": deadline_metrics.snapshot()})
@@ -0,0 +1,116 @@
+import os
+from flask import Blueprint, request, jsonify, send_file, url_for
+from .. import SimpleLogger
+from ..jobs import JobStore, COMPLETED
+from ..options import parse_writer_options
+from .barcode import barcode_generator
+
+# Create blueprint
+bp = Blueprint('jobs', __name__)
+
+logger = SimpleLogger(__name__)
+
+# Limits for submitted jobs
+MAX_JOB_ITEMS = int(os.environ.get('JOB_MAX_ITEMS', 1000000))
+JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', 500))
+DEFAULT_JOB_CONCURRENCY = int(os.environ.get('JOB_DEFAULT_CONCURRENCY', 2))
+
+# Shared job store; rendering happens in the separate worker process
+job_store = JobStore()
+
+
+def _job_response(job):
+    job = dict(job)
+    job.pop('artifact', None)
+    if job['status'] == COMPLETED:
+        job['result_url'] = url_for('jobs.job_result', job_id=job['id'])
+    return job
+
+
+@bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """Submit a batch of barcodes to be rendered in the background.
+
+    JSON Body:
+        data (required): List of strings to encode, one barcode each
+        type: Type of barcode (default: code128)
+        options: Writer options, same names as the /barcode query parameters
+        priority: Higher priorities are rendered first (default: 0)
+        max_concurrency: Chunks of this job rendered at once (default: 2)
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+
+    items = payload.get('data')
+    barcode_type = str(payload.get('type', 'code128')).lower()
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'data' must be a non-empty list of strings"}), 400
+    if len(items) > MAX_JOB_ITEMS:
+        return jsonify({"error": f"Jobs are limited to {MAX_JOB_ITEMS} items"}), 400
+    if not all(isinstance(item, str) and item for item in items):
+        return jsonify({"error": "Every item in 'data' must be a non-empty string"}), 400
+
+    is_valid, (error_response, status_code, _) = barcode_generator.validate_request(items[0], barcode_type)
+    if error_response is not None:
+        return jsonify(error_response), status_code
+
+    try:
+        priority = int(payload.get('priority', 0))
+        max_concurrency = max(1, int(payload.get('max_concurrency', DEFAULT_JOB_CONCURRENCY)))
+    except (ValueError, TypeError):
+        return jsonify({"error": "'priority' and 'max_concurrency' must be integers"}), 400
+
+    writer_options = parse_writer_options(payload.get('options') or {})
+
+    job_id = job_store.create_job(
+        barcode_type, items, writer_options,
+        priority=priority, max_concurrency=max_concurrency, chunk_size=JOB_CHUNK_SIZE
+    )
+
+    response = jsonify(_job_response(job_store.get_job(job_id)))
+    response.status_code = 202
+    response.headers.set('Location', url_for('jobs.job_status', job_id=job_id))
+    return response
+
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Return the status and progress of a job."""
+    job = job_store.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(_job_response(job))
+
+
+@bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    job = job_store.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+
+    if not job_store.cancel_job(job_id):
+        return jsonify({"error": f"Job is already {job['status']}"}), 409
+
+    logger.info(f"Cancelled job {job_id}")
+    return jsonify(_job_response(job_store.get_job(job_id)))
+
+
+@bp.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Download the zip archive of a completed job."""
+    job = job_store.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+
+    if job['status'] != COMPLETED or not job['artifact'] or not os.path.exists(job['artifact']):
+        return jsonify({"error": f"Job is {job['status']}, no result available"}), 409
+
+    return send_file(
+        os.path.abspath(job['artifact']),
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f'barcodes_{job_id}.zip'
+    )
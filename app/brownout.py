@@ -0,0 +1,90 @@
+"""
+Brownout control for the Barcode Generator API.
+
+Under overload it is better to serve cheaper barcodes than to time out. The
+controller watches the number of in-flight requests and a moving average of
+recent request latency. When either crosses its threshold it enters brownout
+and BarcodeGenerator switches to cheaper render settings. It leaves brownout
+only once both signals have dropped well below the thresholds and a minimum
+time has passed, so it doesn't flap around the limit.
+
+State is per process; every server worker runs its own controller.
+"""
+
+import os
+import time
+import threading
+
+from .app_logging import SimpleLogger
+
+
+class BrownoutController:
+    """Decides when rendering should degrade, with hysteresis."""
+
+    def __init__(self, max_in_flight=None, latency_ms=None, recovery_ratio=None,
+                 min_duration=None, smoothing=0.2):
+        """
+        Args:
+            max_in_flight: In-flight requests that trigger brownout
+                           (default: BROWNOUT_MAX_IN_FLIGHT or 16)
+            latency_ms: Average latency in ms that triggers brownout
+                        (default: BROWNOUT_LATENCY_MS or 500)
+            recovery_ratio: Fraction of the thresholds both signals must drop
+                            below to recover (default: BROWNOUT_RECOVERY_RATIO or 0.5)
+            min_duration: Minimum seconds to stay in brownout
+                          (default: BROWNOUT_MIN_DURATION or 10)
+            smoothing: Weight of the newest sample in the latency average
+        """
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.enabled = os.environ.get('BROWNOUT', 'true').lower() in ('true', '1', 't')
+        self.max_in_flight = max_in_flight or int(os.environ.get('BROWNOUT_MAX_IN_FLIGHT', 16))
+        self.latency_ms = latency_ms or float(os.environ.get('BROWNOUT_LATENCY_MS', 500))
+        self.recovery_ratio = recovery_ratio or float(os.environ.get('BROWNOUT_RECOVERY_RATIO', 0.5))
+        self.min_duration = min_duration or float(os.environ.get('BROWNOUT_MIN_DURATION', 10))
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self.average_latency_ms = 0.0
+        self.active = False
+        self._since = 0.0
+        self._lock = threading.Lock()
+
+    def request_started(self):
+        """Record a request entering the render path."""
+        with self._lock:
+            self.in_flight += 1
+            self._update()
+
+    def request_finished(self, duration_ms):
+        """Record a finished request and its latency."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.average_latency_ms += self.smoothing * (duration_ms - self.average_latency_ms)
+            self._update()
+
+    def _update(self):
+        now = time.monotonic()
+        if not self.active:
+            if self.in_flight >= self.max_in_flight or self.average_latency_ms >= self.latency_ms:
+                self.active = True
+                self._since = now
+                self.logger.warning(
+                    f"Entering brownout: {self.in_flight} in flight, "
+                    f"{self.average_latency_ms:.1f}ms average latency"
+                )
+            return
+
+        recovered = (
+            self.in_flight <= self.max_in_flight * self.recovery_ratio
+            and self.average_latency_ms <= self.latency_ms * self.recovery_ratio
+        )
+        if recovered and now - self._since >= self.min_duration:
+            self.active = False
+            self.logger.info(
+                f"Leaving brownout after {now - self._since:.1f}s: "
+                f"{self.in_flight} in flight, {self.average_latency_ms:.1f}ms average latency"
+            )
+
+    def is_degraded(self):
+        """Return True if requests should currently be served degraded."""
+        return self.enabled and self.active
@@ -0,0 +1,80 @@
+"""
+In-memory caches for the Barcode Generator API.
+
+Provides a thread-safe LRU cache bounded by entry count and total size, and
+the canonical cache key for a rendered barcode, so the same barcode requested
+with differently ordered or formatted options maps to one entry.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+
+def cache_key(barcode_type, data, writer_options, *variant):
+    """
+    Build the canonical key for a rendered barcode.
+
+    Args:
+        barcode_type: Barcode type, e.g. 'code128'
+        data: The encoded data
+        writer_options: Writer options as parsed by parse_writer_options
+        *variant: Extra values that change the output (e.g. a degraded flag)
+
+    Returns:
+        str: A key that is identical for identical renders
+    """
+    options = json.dumps(writer_options, sort_keys=True, separators=(',', ':'))
+    return json.dumps([barcode_type, data, options, *variant], separators=(',', ':'))
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries=256, max_bytes=None):
+        """
+        Args:
+            max_entries: Maximum number of entries kept
+            max_bytes: Maximum total size of the values (default: unbounded)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for key, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value (bytes-like) under key, evicting old entries as needed."""
+        size = len(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self._size > self.max_bytes)
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
@@ -0,0 +1,121 @@
+"""
+Optimal Code 128 encoding for the Barcode Generator API.
+
+python-barcode switches between code sets A, B and C with a fixed look-ahead,
+which isn't always the shortest symbol for mixed alphanumeric data or odd
+numeric runs. This module picks the code set sequence with dynamic
+programming so every symbol uses the fewest possible code words, and with
+them the fewest modules to draw.
+"""
+
+from barcode.codex import Code128
+from barcode.charsets import code128
+
+# Code words that change the code set, keyed by (current, target)
+SWITCH_CODES = {
+    ('A', 'B'): code128.A['TO_B'],
+    ('A', 'C'): code128.A['TO_C'],
+    ('B', 'A'): code128.B['TO_A'],
+    ('B', 'C'): code128.B['TO_C'],
+    ('C', 'A'): code128.C['TO_A'],
+    ('C', 'B'): code128.C['TO_B'],
+}
+
+# Shift encodes a single character from the other of code sets A/B
+SHIFT_CODE = code128.A['SHIFT']
+
+CHARSETS = ('A', 'B', 'C')
+
+_TABLES = {'A': code128.A, 'B': code128.B}
+_SHIFT_TO = {'A': 'B', 'B': 'A'}
+
+_INFINITY = float('inf')
+
+
+def _encode_steps(code, pos, charset):
+    """Yield (code_words, next_pos) for the ways to encode code[pos:] in charset."""
+    char = code[pos]
+    if charset == 'C':
+        pair = code[pos:pos + 2]
+        if len(pair) == 2 and pair.isdigit():
+            yield [int(pair)], pos + 2
+        elif char in code128.C:
+            # FNC1 is the only single character code set C can hold
+            yield [code128.C[char]], pos + 1
+        return
+
+    table = _TABLES[charset]
+    if char in table:
+        yield [table[char]], pos + 1
+    else:
+        other = _TABLES[_SHIFT_TO[charset]]
+        if char in other:
+            yield [SHIFT_CODE, other[char]], pos + 1
+
+
+def encode(code):
+    """
+    Encode a string as the shortest sequence of Code 128 code words.
+
+    Args:
+        code: The data to encode, using the same characters python-barcode accepts
+
+    Returns:
+        list: Code words starting with the start code, without checksum or stop
+
+    Raises:
+        ValueError: If a character can't be encoded in any code set
+    """
+    length = len(code)
+    if length == 0:
+        return [code128.START_CODES['B']]
+
+    # cost[pos][charset]: fewest code words for code[pos:] when in charset,
+    # either encoding straight away or after one switch
+    cost = [dict.fromkeys(CHARSETS, _INFINITY) for _ in range(length + 1)]
+    direct = [dict.fromkeys(CHARSETS, _INFINITY) for _ in range(length + 1)]
+    step = [dict() for _ in range(length)]
+    choice = [dict() for _ in range(length)]
+    for charset in CHARSETS:
+        cost[length][charset] = 0
+        direct[length][charset] = 0
+
+    for pos in range(length - 1, -1, -1):
+        for charset in CHARSETS:
+            for words, next_pos in _encode_steps(code, pos, charset):
+                total = len(words) + cost[next_pos][charset]
+                if total < direct[pos][charset]:
+                    direct[pos][charset] = total
+                    step[pos][charset] = (words, next_pos)
+
+        # A switch never pays off twice in a row, so one relaxation is enough
+        for charset in CHARSETS:
+            cost[pos][charset] = direct[pos][charset]
+            choice[pos][charset] = charset
+            for target in CHARSETS:
+                if target != charset and direct[pos][target] + 1 < cost[pos][charset]:
+                    cost[pos][charset] = direct[pos][target] + 1
+                    choice[pos][charset] = target
+
+    # The start code selects the first code set for free
+    charset = min(CHARSETS, key=lambda name: direct[0][name])
+    if direct[0][charset] == _INFINITY:
+        raise ValueError(f"Data can't be encoded in Code 128: {code!r}")
+
+    encoded = [code128.START_CODES[charset]]
+    pos = 0
+    while pos < length:
+        target = choice[pos][charset] if pos else charset
+        if target != charset:
+            encoded.append(SWITCH_CODES[(charset, target)])
+            charset = target
+        words, pos = step[pos][charset]
+        encoded.extend(words)
+    return encoded
+
+
+class OptimalCode128(Code128):
+    """Code 128 barcode that always uses the shortest code set sequence."""
+
+    def _build(self):
+        return encode(self.code)
@@ -0,0 +1,283 @@
+"""
+Template compositing for EAN, UPC and ISBN barcodes.
+
+EAN-8, EAN-13, UPC-A and the ISBN/ISSN symbols built on EAN-13 always have
+the same size, bar height and text position for a given set of writer
+options; only the digits change. ImageWriter still draws every request from
+scratch: it places each bar with its own rectangle, loads the font and lays
+out the text.
+
+A template is built from the first render of an option set. It keeps the
+blank rows above and below the bars, with the quiet zones and the text area,
+and fills a table of digit glyph masks as it meets each (position, digit)
+pair. Later requests build one scanline of bars from per-digit run lengths,
+repeat it down the bar band between the blank rows, and then overlay the
+glyph masks. The bars are placed with the same float
+arithmetic as ImageWriter and the glyphs are cut from Pillow's own text
+rendering, so the output is identical pixel for pixel.
+"""
+
+import os
+from itertools import groupby
+
+from barcode.charsets import ean as _ean
+from barcode.writer import mm2px, pt2mm
+
+try:
+    from PIL import Image, ImageChops, ImageColor, ImageDraw, ImageFont
+except ImportError:  # pragma: no cover - Pillow is a hard requirement of the app
+    Image = ImageChops = ImageColor = ImageDraw = ImageFont = None
+
+from .cache import LRUCache, cache_key
+
+# Types whose layout depends only on the writer options
+TEMPLATE_TYPES = frozenset(['ean8', 'ean13', 'ean', 'upc', 'isbn10', 'isbn13', 'issn'])
+
+# Raw pixel format of a bar scanline for each image mode, one byte per channel
+RAW_MODES = {'RGB': 'RGB', 'L': 'L', '1': '1;8'}
+
+
+def run_lengths(modules):
+    """Signed run lengths of a module string: bars positive, spaces negative."""
+    return tuple(
+        len(list(group)) * (1 if module == '1' else -1) for module, group in groupby(modules)
+    )
+
+
+# Runs of every guard and digit pattern. Every pattern starts and ends with a
+# different module than its neighbours, so the runs of a whole symbol are the
+# runs of its patterns in a row.
+PATTERN_RUNS = {
+    pattern: run_lengths(pattern)
+    for pattern in [_ean.EDGE, _ean.MIDDLE] + [code for codes in _ean.CODES.values() for code in codes]
+}
+
+
+def symbol_layout(length):
+    """
+    Split an EAN/UPC symbol into its guard and digit patterns.
+
+    Args:
+        length: Number of modules in the symbol
+
+    Returns:
+        list: (start, end) module slices, or None for other layouts
+    """
+    digits, remainder = divmod(length - 2 * len(_ean.EDGE) - len(_ean.MIDDLE), 7)
+    if remainder or digits % 2:
+        return None
+    widths = [len(_ean.EDGE)] + [7] * (digits // 2) + [len(_ean.MIDDLE)] + [7] * (digits // 2) + [len(_ean.EDGE)]
+    slices = []
+    start = 0
+    for width in widths:
+        slices.append((start, start + width))
+        start += width
+    return slices
+
+
+class Template:
+    """The fixed parts of a barcode image for one option set."""
+
+    def __init__(self, writer, code, image):
+        """
+        Args:
+            writer: The ImageWriter after rendering the first barcode
+            code: Module string of that barcode
+            image: The image the writer rendered
+        """
+        self.dpi = writer.dpi
+        self.mode = writer.mode
+        self.quiet_zone = writer.quiet_zone
+        self.module_width = writer.module_width
+        self.center_text = writer.center_text
+        self.foreground = writer.foreground
+        self.modules = len(code)
+        self.layout = symbol_layout(self.modules)
+        self.text_length = len(writer.text or '')
+
+        self.size = image.size
+        self.bar_top = int(mm2px(writer.margin_top, self.dpi))
+        # ImageWriter's rectangles include their bottom edge
+        self.bar_bottom = max(self.bar_top, min(
+            int(mm2px(writer.margin_top + writer.module_height, self.dpi)) + 1, image.height
+        ))
+
+        self.rawmode = RAW_MODES.get(self.mode)
+        if self.rawmode:
+            # Full-width rows of each color that scanlines are cut from, and
+            # the blank rows above and below the bars
+            self._background_row = self._pixel(writer.background) * image.width
+            self._foreground_row = self._pixel(writer.foreground) * image.width
+            self._above = self._background_row * self.bar_top
+            self._below = self._background_row * (image.height - self.bar_bottom)
+        self._glyphs = {}
+        self.text_top = writer.margin_top + writer.module_height + writer.text_distance
+        self.font = None
+        if self.text_length:
+            self.font = ImageFont.truetype(
+                writer.font_path, int(mm2px(pt2mm(writer.font_size), self.dpi))
+            )
+
+    def _pixel(self, color):
+        value = ImageColor.getcolor(color, self.mode)
+        return bytes(value) if isinstance(value, tuple) else bytes([value])
+
+    def __len__(self):
+        # Size in the template cache: the blank rows dominate
+        if not self.rawmode:
+            return 0
+        return len(self._above) + len(self._below) + 2 * len(self._background_row)
+
+    def _runs(self, code):
+        if self.layout is None:
+            return run_lengths(code)
+        runs = ()
+        for start, end in self.layout:
+            pattern = code[start:end]
+            pattern_runs = PATTERN_RUNS.get(pattern)
+            if pattern_runs is None:
+                pattern_runs = PATTERN_RUNS.setdefault(pattern, run_lengths(pattern))
+            runs += pattern_runs
+        return runs
+
+    def _bars(self, code):
+        """
+        Draw the bars of `code` into one scanline.
+
+        Positions are accumulated exactly like BaseWriter.render and
+        truncated to pixels like ImageWriter's rectangles.
+
+        Returns:
+            tuple: (scanline bytes, text anchor in pixels), or None if a bar
+                   is narrower than a pixel (ImageWriter refuses those)
+        """
+        row = bytearray(self._background_row)
+        foreground = memoryview(self._foreground_row)
+        depth = len(self._foreground_row) // self.size[0]
+        xpos = self.quiet_zone
+        for run in self._runs(code):
+            width = self.module_width * abs(run)
+            if run > 0:
+                x0 = int(mm2px(xpos, self.dpi))
+                x1 = int(mm2px(xpos + width, self.dpi) - 1) + 1
+                if x1 <= x0:
+                    return None
+                row[x0 * depth:x1 * depth] = foreground[x0 * depth:x1 * depth]
+            xpos += width
+
+        text_x = self.quiet_zone + (xpos - self.quiet_zone) / 2.0 if self.center_text else self.quiet_zone
+        return bytes(row), (mm2px(text_x, self.dpi), mm2px(self.text_top, self.dpi))
+
+    def _glyph(self, position, index, char):
+        """Mask of `char` at `index` of the text, cut from a full text render."""
+        # The text is centred on the symbol, whose width can differ in the
+        # last bits between codes, so a few anchor positions occur
+        key = (position, index, char)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            # Spaces keep every other character's place, and where glyphs
+            # overlap Pillow keeps the strongest coverage, so the masks
+            # combine back into the full text exactly
+            mask = Image.new('L', self.size)
+            text = ' ' * index + char + ' ' * (self.text_length - index - 1)
+            ImageDraw.Draw(mask).text(position, text, font=self.font, fill=255, anchor='md')
+            box = mask.getbbox()
+            glyph = (box, mask.crop(box)) if box else (None, None)
+            self._glyphs[key] = glyph
+        return glyph
+
+    def _paint_text(self, image, text, position):
+        glyphs = [(box, glyph) for box, glyph in (
+            self._glyph(position, index, char) for index, char in enumerate(text)
+        ) if box]
+        if not glyphs:
+            return
+
+        boxes = [box for box, _ in glyphs]
+        if all(previous[2] <= box[0] for previous, box in zip(boxes, boxes[1:])):
+            # Glyphs side by side: each one is painted through its own mask
+            for box, glyph in glyphs:
+                image.paste(self.foreground, box[:2], glyph)
+            return
+
+        # Overlapping glyphs are merged into one mask first, as Pillow does
+        left = min(box[0] for box in boxes)
+        top = min(box[1] for box in boxes)
+        mask = Image.new('L', (max(box[2] for box in boxes) - left, max(box[3] for box in boxes) - top))
+        for box, glyph in glyphs:
+            local = (box[0] - left, box[1] - top, box[2] - left, box[3] - top)
+            mask.paste(ImageChops.lighter(mask.crop(local), glyph), local)
+        image.paste(self.foreground, (left, top), mask)
+
+    def composite(self, code, text):
+        """
+        Render a barcode from the template.
+
+        Args:
+            code: Module string from the barcode's build()
+            text: Text under the bars ('' for none)
+
+        Returns:
+            PIL.Image.Image: The barcode, or None if it doesn't fit the template
+        """
+        if not self.rawmode or len(code) != self.modules or len(text) != self.text_length:
+            return None
+        bars = self._bars(code)
+        if bars is None:
+            return None
+        row, text_position = bars
+
+        # Every row of the bar band is the same scanline
+        pixels = b''.join((self._above, row * (self.bar_bottom - self.bar_top), self._below))
+        image = Image.frombytes(self.mode, self.size, pixels, 'raw', self.rawmode)
+
+        if text:
+            self._paint_text(image, text, text_position)
+        return image
+
+
+class TemplateCompositor:
+    """Renders EAN/UPC/ISBN barcodes from cached per-option templates."""
+
+    def __init__(self, max_templates=None):
+        """
+        Args:
+            max_templates: Option sets kept (default: TEMPLATE_CACHE_SIZE or 64)
+        """
+        self.templates = LRUCache(max_templates or int(os.environ.get('TEMPLATE_CACHE_SIZE', 64)))
+
+    def supports(self, barcode_type, writer_options):
+        """Return True if the barcode can be rendered from a template."""
+        # Custom text changes from request to request
+        return barcode_type in TEMPLATE_TYPES and 'text' not in writer_options
+
+    def render(self, barcode_type, barcode_instance, writer_options):
+        """
+        Render a barcode, from its template when one exists.
+
+        The first barcode of an option set is rendered by its writer and
+        becomes the template for the rest.
+
+        Args:
+            barcode_type: Barcode type, e.g. 'ean13'
+            barcode_instance: Barcode with an ImageWriter set up for the options
+            writer_options: Writer options as parsed by parse_writer_options
+
+        Returns:
+            PIL.Image.Image: The rendered barcode
+        """
+        writer = barcode_instance.writer
+        key = cache_key(barcode_type, None, writer_options, writer.mode)
+        template = self.templates.get(key)
+
+        if template is not None:
+            code = barcode_instance.build()[0]
+            text = barcode_instance.get_fullcode() if template.text_length else ''
+            image = template.composite(code, text)
+            if image is not None:
+                return image
+
+        image = barcode_instance.render(writer_options)
+        if template is None:
+            self.templates.set(key, Template(writer, barcode_instance.build()[0], image))
+        return image
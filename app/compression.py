@@ -0,0 +1,163 @@
+"""
+Response compression for the Barcode Generator API.
+
+This module negotiates gzip, zstd and brotli compression from the client's
+Accept-Encoding header. Bodies are compressed per request at levels suited
+to dynamic content. A body seen a second time, such as the form page, has
+its compressed variants kept in a small LRU cache keyed by a digest of the
+body, so it isn't compressed again. One-off bodies, like barcode JSON with
+its per-request `generated_at`, never enter the cache.
+"""
+
+import os
+import gzip
+import hashlib
+
+from .app_logging import SimpleLogger
+from .cache import LRUCache
+
+# Optional encoders - gzip is always available from the standard library
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on installed extras
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on installed extras
+    zstandard = None
+
+
+class ResponseCompressor:
+    """Compresses responses and caches the compressed variants."""
+
+    # Content types worth compressing (PNG is already deflate-compressed)
+    COMPRESSIBLE_TYPES = [
+        'application/json',
+        'image/svg+xml',
+        'text/html',
+        'text/plain',
+        'text/css',
+        'application/javascript',
+    ]
+
+    def __init__(self, min_size=None, gzip_level=None, brotli_level=None,
+                 zstd_level=None, cache_size=None):
+        """
+        Args:
+            min_size: Smallest body in bytes that gets compressed
+                      (default: COMPRESS_MIN_SIZE or 500)
+            gzip_level: gzip level 1-9 (default: COMPRESS_GZIP_LEVEL or 6)
+            brotli_level: brotli quality 0-11 (default: COMPRESS_BR_LEVEL or 5)
+            zstd_level: zstd level 1-22 (default: COMPRESS_ZSTD_LEVEL or 3)
+            cache_size: Number of compressed variants to keep
+                        (default: COMPRESS_CACHE_SIZE or 256)
+        """
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.enabled = os.environ.get('COMPRESS', 'true').lower() in ('true', '1', 't')
+        self.min_size = self._setting(min_size, 'COMPRESS_MIN_SIZE', 500)
+        # Levels for dynamic content: most barcodes are requested only a
+        # few times, so the top levels would cost more CPU than they save
+        self.levels = {
+            'gzip': self._setting(gzip_level, 'COMPRESS_GZIP_LEVEL', 6),
+            'br': self._setting(brotli_level, 'COMPRESS_BR_LEVEL', 5),
+            'zstd': self._setting(zstd_level, 'COMPRESS_ZSTD_LEVEL', 3),
+        }
+        self.cache_size = self._setting(cache_size, 'COMPRESS_CACHE_SIZE', 256)
+
+        # Server preference order, used to break ties between equal q-values
+        self.encodings = []
+        if brotli is not None:
+            self.encodings.append('br')
+        if zstandard is not None:
+            self.encodings.append('zstd')
+        self.encodings.append('gzip')
+
+        self._cache = LRUCache(max_entries=self.cache_size)
+        # Digests of recently compressed bodies; a body is cached once it repeats
+        self._seen = LRUCache(max_entries=self.cache_size * 4)
+
+    @staticmethod
+    def _setting(value, env_name, default):
+        if value is not None:
+            return int(value)
+        return int(os.environ.get(env_name, default))
+
+    def _compress(self, body, encoding):
+        level = self.levels[encoding]
+        if encoding == 'br':
+            return brotli.compress(body, quality=level)
+        if encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=level).compress(body)
+        # mtime=0 keeps the output deterministic for identical bodies
+        return gzip.compress(body, compresslevel=level, mtime=0)
+
+    def get_variant(self, body, encoding):
+        """Return the compressed variant of body.
+
+        Variants of bodies that repeat are cached, so those are compressed at
+        most twice; the first time a body is seen only its digest is kept.
+
+        Args:
+            body: The uncompressed response body
+            encoding: One of the negotiated encodings ('br', 'zstd', 'gzip')
+
+        Returns:
+            bytes: The compressed body
+        """
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        key = (digest, encoding)
+        compressed = self._cache.get(key)
+        if compressed is None:
+            compressed = self._compress(body, encoding)
+            if self._seen.get(key) is not None:
+                self._cache.set(key, compressed)
+            else:
+                self._seen.set(key, digest)
+        return compressed
+
+    def is_compressible(self, response):
+        """Check whether a response should be compressed at all."""
+        if not self.enabled or response.status_code != 200:
+            return False
+        if response.direct_passthrough or response.is_streamed:
+            return False
+        if 'Content-Encoding' in response.headers:
+            return False
+        return response.mimetype in self.COMPRESSIBLE_TYPES
+
+    def compress_response(self, response, accept_encodings):
+        """Compress a Flask response in place if the client supports it.
+
+        Args:
+            response: The outgoing Flask response
+            accept_encodings: The request's parsed Accept-Encoding header
+
+        Returns:
+            The (possibly) compressed response
+        """
+        if not self.is_compressible(response):
+            return response
+
+        # The body depends on Accept-Encoding even when we end up not compressing
+        response.vary.add('Accept-Encoding')
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        encoding = accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        compressed = self.get_variant(body, encoding)
+        if len(compressed) >= len(body):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        self.logger.debug(
+            f"Compressed {response.mimetype} with {encoding}: "
+            f"{len(body)}b -> {len(compressed)}b"
+        )
+        return response
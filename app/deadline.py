@@ -0,0 +1,236 @@
+"""
+Request deadlines for the Barcode Generator API.
+
+A render nobody will read is wasted CPU: the client has given up, its proxy
+has timed out, or it has disconnected. Every barcode request gets a deadline
+when it arrives. The deadline comes from the X-Request-Timeout-Ms header,
+capped by the server default. It is checked at a few cheap checkpoints on
+the way to a finished PNG: before the handler starts (time spent queued),
+before rendering and before PNG encoding. Rendering can't be interrupted
+mid-draw, so a late request stops at the next checkpoint.
+
+Under the ASGI server the deadline is created as soon as the request
+arrives, so time spent waiting for a worker thread counts against it.
+DeadlineMiddleware also watches for the client's disconnect event and
+cancels the deadline, which stops the render at its next checkpoint.
+
+Dropped work is counted per stage in `deadline_metrics`.
+"""
+
+import os
+import math
+import uuid
+import time
+import asyncio
+import threading
+
+from .app_logging import SimpleLogger
+
+TIMEOUT_HEADER = 'X-Request-Timeout-Ms'
+
+# Links a request seen by DeadlineMiddleware to the same request in Flask
+TOKEN_HEADER = 'X-Deadline-Token'
+
+# Order in which a request passes the checkpoints
+STAGES = ('queue', 'render', 'encode')
+
+EXPIRED = 'expired'
+DISCONNECTED = 'disconnected'
+
+
+class DeadlineExceeded(Exception):
+    """Raised at a checkpoint when a request's result is no longer wanted."""
+
+    def __init__(self, stage, reason):
+        self.stage = stage
+        self.reason = reason
+        # 499 is the de facto status for a client that closed the request
+        self.status_code = 504 if reason == EXPIRED else 499
+        if reason == EXPIRED:
+            message = f"Request deadline exceeded before {stage}"
+        else:
+            message = f"Client disconnected before {stage}"
+        super().__init__(message)
+
+
+class DeadlineMetrics:
+    """Counts requests dropped at each checkpoint and estimates the work saved."""
+
+    def __init__(self, smoothing=0.2):
+        """
+        Args:
+            smoothing: Weight of the newest sample in the render time averages
+        """
+        self.smoothing = smoothing
+        self.dropped = {stage: {EXPIRED: 0, DISCONNECTED: 0} for stage in STAGES}
+        self.average_render_ms = 0.0
+        self.average_encode_ms = 0.0
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record_render(self, render_ms, encode_ms):
+        """Record how long a completed render spent drawing and encoding."""
+        with self._lock:
+            self.average_render_ms += self.smoothing * (render_ms - self.average_render_ms)
+            self.average_encode_ms += self.smoothing * (encode_ms - self.average_encode_ms)
+
+    def record_drop(self, stage, reason):
+        """Record a request dropped at `stage` and the render time it saved."""
+        with self._lock:
+            self.dropped[stage][reason] += 1
+            # Estimated from recent renders; cache hits would have cost less
+            self.saved_ms += self.average_encode_ms
+            if stage != 'encode':
+                self.saved_ms += self.average_render_ms
+
+    def snapshot(self):
+        """Return the counters as a JSON serializable dict."""
+        with self._lock:
+            return {
+                'dropped': {stage: dict(counts) for stage, counts in self.dropped.items()},
+                'total_dropped': sum(sum(counts.values()) for counts in self.dropped.values()),
+                'estimated_render_ms_saved': round(self.saved_ms, 1),
+                'average_render_ms': round(self.average_render_ms, 2),
+                'average_encode_ms': round(self.average_encode_ms, 2),
+            }
+
+
+deadline_metrics = DeadlineMetrics()
+
+
+class Deadline:
+    """Point in time after which a request's result is no longer wanted."""
+
+    def __init__(self, timeout_ms=None, start=None):
+        """
+        Args:
+            timeout_ms: Time budget from `start` in ms (default: no deadline)
+            start: time.monotonic() of the request's arrival (default: now)
+        """
+        start = time.monotonic() if start is None else start
+        self.expires_at = start + timeout_ms / 1000 if timeout_ms else None
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def from_header(cls, value, start=None):
+        """
+        Create the deadline for a request.
+
+        Args:
+            value: The client's timeout in ms, usually the X-Request-Timeout-Ms
+                   header, or None
+            start: time.monotonic() of the request's arrival (default: now)
+
+        Returns:
+            Deadline: The client's timeout capped by REQUEST_TIMEOUT_MS
+        """
+        default_ms = float(os.environ.get('REQUEST_TIMEOUT_MS', 30000))
+        try:
+            timeout_ms = float(value) if value else None
+        except (TypeError, ValueError):
+            timeout_ms = None
+
+        if timeout_ms is None or not math.isfinite(timeout_ms) or timeout_ms <= 0:
+            timeout_ms = default_ms
+        elif default_ms > 0:
+            timeout_ms = min(timeout_ms, default_ms)
+        return cls(timeout_ms, start)
+
+    def remaining_ms(self):
+        """Milliseconds left, or None if there is no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000)
+
+    def cancel(self):
+        """Mark the request as abandoned, e.g. because the client disconnected."""
+        self._cancelled.set()
+
+    def check(self, stage):
+        """
+        Checkpoint before `stage`.
+
+        Raises:
+            DeadlineExceeded: If the client went away or the deadline passed
+        """
+        if self._cancelled.is_set():
+            reason = DISCONNECTED
+        elif self.expires_at is not None and time.monotonic() >= self.expires_at:
+            reason = EXPIRED
+        else:
+            return
+        deadline_metrics.record_drop(stage, reason)
+        raise DeadlineExceeded(stage, reason)
+
+
+# Deadlines created by DeadlineMiddleware, waiting for their Flask request
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def claim_deadline(token):
+    """Take the deadline DeadlineMiddleware registered under `token`, if any."""
+    with _pending_lock:
+        return _pending.pop(token, None)
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that starts each request's deadline on arrival and
+    cancels it when the client disconnects.
+
+    The wrapped WSGI app runs in a thread pool and never sees ASGI events,
+    so the deadline is handed over through a registry keyed by a token
+    header added to the request.
+    """
+
+    def __init__(self, app):
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.app = app
+        self._token_header = TOKEN_HEADER.lower().encode('latin-1')
+        self._timeout_header = TIMEOUT_HEADER.lower().encode('latin-1')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timeout = None
+        headers = []
+        for name, value in scope['headers']:
+            if name == self._timeout_header:
+                timeout = value.decode('latin-1')
+            # Only tokens issued here are trusted
+            if name != self._token_header:
+                headers.append((name, value))
+
+        deadline = Deadline.from_header(timeout)
+        token = uuid.uuid4().hex
+        headers.append((self._token_header, token.encode('latin-1')))
+        with _pending_lock:
+            _pending[token] = deadline
+
+        watcher = None
+
+        async def watch_disconnect():
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                self.logger.debug(f"Client disconnected from {scope['path']}, cancelling its render")
+                deadline.cancel()
+
+        async def receive_body():
+            nonlocal watcher
+            message = await receive()
+            if message['type'] == 'http.request' and not message.get('more_body', False):
+                # The body is complete; from here on the only event left is disconnect
+                watcher = asyncio.ensure_future(watch_disconnect())
+            elif message['type'] == 'http.disconnect':
+                deadline.cancel()
+            return message
+
+        try:
+            await self.app(dict(scope, headers=headers), receive_body, send)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            claim_deadline(token)
@@ -0,0 +1,608 @@
+"""
+Asynchronous batch jobs for the Barcode Generator API.
+
+Very large exports are submitted as jobs instead of being rendered inside an
+HTTP request. Jobs and their items live in a local SQLite database so they
+survive restarts. The web app only writes to that queue; a separate worker
+process (see ``worker.py``) claims chunks of items, renders them with
+``BarcodeGenerator`` in a pool of processes and assembles a zip archive that
+clients download once the job has finished.
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from .app_logging import SimpleLogger
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Chunk states
+PENDING = 'pending'
+DONE = 'done'
+
+# How many times a chunk is retried if its render process dies
+MAX_CHUNK_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    max_concurrency INTEGER NOT NULL DEFAULT 1,
+    barcode_type TEXT NOT NULL,
+    options TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    artifact TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    start_idx INTEGER NOT NULL,
+    end_idx INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    errors TEXT,
+    PRIMARY KEY (job_id, chunk)
+);
+CREATE INDEX IF NOT EXISTS job_chunks_status ON job_chunks (status, job_id);
+"""
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _isoformat(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+
+class JobStore:
+    """Durable job queue backed by SQLite."""
+
+    def __init__(self, db_path=None, artifact_dir=None):
+        """
+        Args:
+            db_path: SQLite database file (default: JOB_DB_PATH or data/jobs.sqlite3)
+            artifact_dir: Directory for rendered archives
+                          (default: JOB_ARTIFACT_DIR or data/jobs)
+        """
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.db_path = db_path or os.environ.get('JOB_DB_PATH', os.path.join('data', 'jobs.sqlite3'))
+        self.artifact_dir = artifact_dir or os.environ.get('JOB_ARTIFACT_DIR', os.path.join('data', 'jobs'))
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            os.makedirs(self.artifact_dir, exist_ok=True)
+
+        # Autocommit mode; transactions are opened explicitly
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+
+        if not self._initialized:
+            conn.executescript(SCHEMA)
+            self._initialized = True
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.artifact_dir, job_id)
+
+    def create_job(self, barcode_type, items, options=None, priority=0,
+                   max_concurrency=1, chunk_size=500):
+        """Queue a new job.
+
+        Args:
+            barcode_type: Barcode type used for every item
+            items: List of data strings to encode
+            options: Writer options shared by all items
+            priority: Higher priorities are rendered first (default: 0)
+            max_concurrency: Maximum number of chunks rendered at once for this job
+            chunk_size: Number of items handed to a render process at a time
+
+        Returns:
+            str: The new job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, status, priority, max_concurrency, barcode_type, '
+                'options, total, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, QUEUED, priority, max_concurrency, barcode_type,
+                 json.dumps(options or {}), len(items), now)
+            )
+            conn.executemany(
+                'INSERT INTO job_items (job_id, idx, data) VALUES (?, ?, ?)',
+                ((job_id, idx, data) for idx, data in enumerate(items))
+            )
+            conn.executemany(
+                'INSERT INTO job_chunks (job_id, chunk, start_idx, end_idx, status) '
+                'VALUES (?, ?, ?, ?, ?)',
+                ((job_id, chunk, start, min(start + chunk_size, len(items)), PENDING)
+                 for chunk, start in enumerate(range(0, len(items), chunk_size)))
+            )
+
+        self.logger.info(f"Queued job {job_id} with {len(items)} {barcode_type} items")
+        return job_id
+
+    def get_job(self, job_id):
+        """Return the job as a dict, or None if it doesn't exist."""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job['options'] = json.loads(job['options'])
+        processed = job['completed'] + job['failed']
+        job['progress'] = round(processed / job['total'], 4) if job['total'] else 1.0
+        for key in ('created_at', 'started_at', 'finished_at'):
+            job[key] = _isoformat(job[key])
+        return job
+
+    def cancel_job(self, job_id):
+        """Cancel a job that hasn't finished yet.
+
+        Returns:
+            bool: True if the job was cancelled
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)',
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            )
+        return cursor.rowcount > 0
+
+    def reset_in_flight(self):
+        """Put chunks that were rendering when the worker stopped back in the queue.
+
+        Returns:
+            int: Number of chunks that will be rendered again
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE job_chunks SET status = ? WHERE status = ?', (PENDING, RUNNING)
+            )
+        return cursor.rowcount
+
+    def claim_chunks(self, slots):
+        """Claim up to `slots` pending chunks, honouring priorities and per-job caps.
+
+        Jobs are served by priority (highest first) and then submission time.
+        A job never has more than its max_concurrency chunks rendering at once.
+
+        Returns:
+            list: Chunk dicts with the items and settings needed to render them
+        """
+        claimed = []
+        if slots <= 0:
+            return claimed
+
+        now = time.time()
+        with self._transaction() as conn:
+            in_flight = dict(conn.execute(
+                'SELECT job_id, COUNT(*) FROM job_chunks WHERE status = ? GROUP BY job_id',
+                (RUNNING,)
+            ).fetchall())
+            jobs = conn.execute(
+                'SELECT id, barcode_type, options, max_concurrency FROM jobs '
+                'WHERE status IN (?, ?) ORDER BY priority DESC, created_at',
+                (QUEUED, RUNNING)
+            ).fetchall()
+
+            for job in jobs:
+                allowance = min(job['max_concurrency'] - in_flight.get(job['id'], 0),
+                                slots - len(claimed))
+                if allowance <= 0:
+                    continue
+
+                chunks = conn.execute(
+                    'SELECT chunk, start_idx, end_idx FROM job_chunks '
+                    'WHERE job_id = ? AND status = ? ORDER BY chunk LIMIT ?',
+                    (job['id'], PENDING, allowance)
+                ).fetchall()
+                if not chunks:
+                    continue
+
+                conn.execute(
+                    'UPDATE jobs SET status = ?, started_at = COALESCE(started_at, ?) '
+                    'WHERE id = ? AND status = ?',
+                    (RUNNING, now, job['id'], QUEUED)
+                )
+                for chunk in chunks:
+                    conn.execute(
+                        'UPDATE job_chunks SET status = ?, attempts = attempts + 1 '
+                        'WHERE job_id = ? AND chunk = ?',
+                        (RUNNING, job['id'], chunk['chunk'])
+                    )
+                    items = conn.execute(
+                        'SELECT idx, data FROM job_items WHERE job_id = ? '
+                        'AND idx >= ? AND idx < ? ORDER BY idx',
+                        (job['id'], chunk['start_idx'], chunk['end_idx'])
+                    ).fetchall()
+                    claimed.append({
+                        'job_id': job['id'],
+                        'chunk': chunk['chunk'],
+                        'barcode_type': job['barcode_type'],
+                        'options': json.loads(job['options']),
+                        'items': [tuple(item) for item in items],
+                    })
+
+                if len(claimed) >= slots:
+                    break
+
+        return claimed
+
+    def complete_chunk(self, job_id, chunk, rendered, errors):
+        """Record the result of a rendered chunk and update the job's progress.
+
+        Args:
+            job_id: The job the chunk belongs to
+            chunk: Chunk number
+            rendered: Number of items rendered successfully
+            errors: List of {"index", "data", "error"} dicts for failed items
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                'UPDATE job_chunks SET status = ?, errors = ? WHERE job_id = ? AND chunk = ?',
+                (DONE, json.dumps(errors), job_id, chunk)
+            )
+            conn.execute(
+                'UPDATE jobs SET completed = completed + ?, failed = failed + ? WHERE id = ?',
+                (rendered, len(errors), job_id)
+            )
+
+    def retry_or_fail_chunk(self, job_id, chunk, error):
+        """Handle a chunk whose render process crashed.
+
+        The chunk goes back to the queue until it has been attempted
+        MAX_CHUNK_ATTEMPTS times, after which all of its items count as failed.
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT start_idx, end_idx, attempts FROM job_chunks WHERE job_id = ? AND chunk = ?',
+                (job_id, chunk)
+            ).fetchone()
+            if row is None:
+                return
+
+            if row['attempts'] < MAX_CHUNK_ATTEMPTS:
+                conn.execute(
+                    'UPDATE job_chunks SET status = ? WHERE job_id = ? AND chunk = ?',
+                    (PENDING, job_id, chunk)
+                )
+                return
+
+            errors = [{'index': idx, 'error': error} for idx in range(row['start_idx'], row['end_idx'])]
+            conn.execute(
+                'UPDATE job_chunks SET status = ?, errors = ? WHERE job_id = ? AND chunk = ?',
+                (DONE, json.dumps(errors), job_id, chunk)
+            )
+            conn.execute(
+                'UPDATE jobs SET failed = failed + ? WHERE id = ?', (len(errors), job_id)
+            )
+
+    def jobs_ready_to_assemble(self):
+        """Return ids of running jobs whose chunks have all been rendered."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT id FROM jobs WHERE status = ? AND NOT EXISTS ('
+                'SELECT 1 FROM job_chunks WHERE job_chunks.job_id = jobs.id AND status != ?)',
+                (RUNNING, DONE)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row['id'] for row in rows]
+
+    def chunk_errors(self, job_id):
+        """Collect the per-item errors of a job, in item order."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT errors FROM job_chunks WHERE job_id = ? AND errors IS NOT NULL ORDER BY chunk',
+                (job_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        errors = []
+        for row in rows:
+            errors.extend(json.loads(row['errors']))
+        return errors
+
+    def finish_job(self, job_id, status, artifact=None, error=None):
+        """Mark a job as finished, unless it was cancelled in the meantime."""
+        with self._transaction() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, artifact = ?, error = ?, finished_at = ? '
+                'WHERE id = ? AND status = ?',
+                (status, artifact, error, time.time(), job_id, RUNNING)
+            )
+
+    def expired_jobs(self, retention):
+        """Return ids of finished jobs older than `retention` seconds."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?',
+                (*FINISHED_STATES, time.time() - retention)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row['id'] for row in rows]
+
+    def delete_job(self, job_id):
+        """Remove a job, its items and its artifacts."""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM job_chunks WHERE job_id = ?', (job_id,))
+            conn.execute('DELETE FROM job_items WHERE job_id = ?', (job_id,))
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+
+def _part_path(job_dir, chunk):
+    return os.path.join(job_dir, f'part-{chunk:06d}.zip')
+
+
+def _entry_name(index, data):
+    safe = re.sub(r'[^A-Za-z0-9._-]', '_', data)[:40]
+    return f'{index:06d}-{safe}.png'
+
+
+# Per-process generator, created on first use inside each render process
+_generator = None
+
+
+def render_chunk(job_dir, chunk, barcode_type, options, items):
+    """Render one chunk of a job into its own zip file.
+
+    Runs inside a render process. Items are rendered straight through the
+    render path: one-off batch barcodes would only push interactive renders
+    out of the render cache. Items that fail to render are reported back
+    instead of failing the whole chunk or being logged.
+
+    Returns:
+        tuple: (rendered, errors)
+    """
+    global _generator
+    if _generator is None:
+        from .blueprints.barcode import BarcodeGenerator
+        _generator = BarcodeGenerator()
+
+    os.makedirs(job_dir, exist_ok=True)
+    part_path = _part_path(job_dir, chunk)
+    tmp_path = part_path + '.tmp'
+
+    rendered = 0
+    errors = []
+    # PNG data is already compressed, so entries are stored as-is
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for index, data in items:
+            try:
+                content = _generator.render_png(data, barcode_type, **options)
+            except Exception as e:
+                errors.append({'index': index, 'data': data, 'error': str(e)})
+                continue
+            archive.writestr(_entry_name(index, data), content)
+            rendered += 1
+
+    os.replace(tmp_path, part_path)
+    return rendered, errors
+
+
+def assemble_job(job_dir, errors):
+    """Merge the chunk archives of a finished job into barcodes.zip.
+
+    Runs inside a render process so large merges don't stall the dispatcher.
+
+    Returns:
+        str: Path of the assembled archive
+    """
+    artifact = os.path.join(job_dir, 'barcodes.zip')
+    tmp_path = artifact + '.tmp'
+    parts = sorted(glob.glob(os.path.join(job_dir, 'part-*.zip')))
+
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for part_path in parts:
+            with zipfile.ZipFile(part_path) as part:
+                for info in part.infolist():
+                    archive.writestr(info, part.read(info))
+        if errors:
+            archive.writestr('errors.json', json.dumps(errors, indent=2),
+                             compress_type=zipfile.ZIP_DEFLATED)
+
+    os.replace(tmp_path, artifact)
+    return artifact
+
+
+def remove_parts(job_dir):
+    """Delete the chunk archives once the assembled archive is recorded."""
+    for part_path in glob.glob(os.path.join(job_dir, 'part-*.zip')):
+        os.remove(part_path)
+
+
+class JobDispatcher:
+    """Feeds queued chunks to a pool of render processes."""
+
+    def __init__(self, store=None, workers=None, poll_interval=None, retention=None):
+        """
+        Args:
+            store: JobStore to work from (default: a new JobStore)
+            workers: Number of render processes (default: JOB_WORKERS or CPU count)
+            poll_interval: Seconds between queue polls when idle
+                           (default: JOB_POLL_INTERVAL or 1)
+            retention: Seconds finished jobs and their archives are kept
+                       (default: JOB_RETENTION or 86400)
+        """
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.store = store or JobStore()
+        self.workers = workers or _env_int('JOB_WORKERS', os.cpu_count() or 1)
+        self.poll_interval = poll_interval or float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+        self.retention = retention or _env_int('JOB_RETENTION', 86400)
+        self._running = False
+        self._last_cleanup = 0
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        """Process jobs until stop() is called."""
+        resumed = self.store.reset_in_flight()
+        if resumed:
+            self.logger.info(f"Resuming {resumed} interrupted chunks")
+
+        self._running = True
+        futures = {}
+        assembling = set()
+
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while self._running:
+                self._cleanup()
+                claimed = []
+                try:
+                    # Assemble finished jobs in the pool so polling isn't blocked
+                    for job_id in self.store.jobs_ready_to_assemble():
+                        if job_id in assembling:
+                            continue
+                        errors = self.store.chunk_errors(job_id)
+                        future = pool.submit(assemble_job, self.store.job_dir(job_id), errors)
+                        futures[future] = ('assemble', job_id, None)
+                        assembling.add(job_id)
+
+                    slots = self.workers - sum(1 for kind, _, _ in futures.values() if kind == 'chunk')
+                    claimed = self.store.claim_chunks(slots)
+                    while claimed:
+                        chunk = claimed[0]
+                        future = pool.submit(
+                            render_chunk, self.store.job_dir(chunk['job_id']), chunk['chunk'],
+                            chunk['barcode_type'], chunk['options'], chunk['items']
+                        )
+                        futures[future] = ('chunk', chunk['job_id'], chunk['chunk'])
+                        claimed.pop(0)
+
+                    if not futures:
+                        time.sleep(self.poll_interval)
+                        continue
+
+                    done, _ = wait(futures, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if isinstance(future.exception(), BrokenProcessPool):
+                            raise future.exception()
+                        kind, job_id, chunk = futures.pop(future)
+                        if kind == 'chunk':
+                            self._chunk_finished(future, job_id, chunk)
+                        else:
+                            assembling.discard(job_id)
+                            self._job_assembled(future, job_id)
+
+                except BrokenProcessPool as e:
+                    # A render process died (OOM, crash in a native library)
+                    # and took the pool with it
+                    self.logger.error(f"Render pool broke, restarting it: {str(e)}")
+                    self._requeue(futures, claimed, str(e) or 'Render process died')
+                    assembling.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=self.workers)
+        finally:
+            pool.shutdown(wait=True)
+
+    def _requeue(self, futures, claimed, error):
+        """Send the work lost with a broken pool back through the retry path.
+
+        Every chunk that was rendering, or claimed but not yet submitted,
+        counts an attempt. Assemblies are simply submitted again on the next
+        poll.
+        """
+        lost = [(job_id, chunk) for kind, job_id, chunk in futures.values() if kind == 'chunk']
+        lost += [(chunk['job_id'], chunk['chunk']) for chunk in claimed]
+        futures.clear()
+        for job_id, chunk in lost:
+            self.store.retry_or_fail_chunk(job_id, chunk, error)
+
+    def _chunk_finished(self, future, job_id, chunk):
+        try:
+            rendered, errors = future.result()
+        except Exception as e:
+            self.logger.error(f"Chunk {chunk} of job {job_id} crashed: {str(e)}")
+            self.store.retry_or_fail_chunk(job_id, chunk, str(e))
+            return
+        self.store.complete_chunk(job_id, chunk, rendered, errors)
+
+    def _job_assembled(self, future, job_id):
+        try:
+            artifact = future.result()
+        except Exception as e:
+            self.logger.error(f"Assembling job {job_id} failed: {str(e)}")
+            self.store.finish_job(job_id, FAILED, error=str(e))
+            return
+        self.store.finish_job(job_id, COMPLETED, artifact=artifact)
+        # Parts are only removed now, so a crash before this point re-assembles
+        remove_parts(self.store.job_dir(job_id))
+        self.logger.info(f"Job {job_id} completed")
+
+    def _cleanup(self):
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+
+        for job_id in self.store.expired_jobs(self.retention):
+            self.store.delete_job(job_id)
+            self.logger.info(f"Removed expired job {job_id}")
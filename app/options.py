@@ -0,0 +1,48 @@
+"""
+Writer option parsing for the Barcode Generator API.
+
+Kept free of Flask, Pillow and python-barcode so that light processes such
+as the front router can compute the canonical key of a request without
+loading the render stack.
+"""
+
+
+def parse_writer_options(params):
+    """Pick the known writer options out of params and convert their types.
+
+    Args:
+        params: Mapping of option names to values, e.g. request.args or a
+                JSON object. Unknown keys and unparsable numbers are ignored.
+
+    Returns:
+        dict: Writer options suitable for BarcodeGenerator
+    """
+    writer_options = {}
+    float_params = ['module_width', 'module_height', 'quiet_zone', 'text_distance']
+    int_params = ['font_size']
+    bool_params = ['write_text', 'center_text', 'guardbar']
+    color_params = ['background', 'foreground']
+    float_params += ['guardbar_height']
+
+    # Process writer options
+    for param in params:
+        if param in float_params + int_params + bool_params + color_params + ['text']:
+            value = params.get(param)
+
+            # Convert to appropriate type
+            if param in float_params:
+                try:
+                    writer_options[param] = float(value)
+                except (ValueError, TypeError):
+                    pass
+            elif param in int_params:
+                try:
+                    writer_options[param] = int(value)
+                except (ValueError, TypeError):
+                    pass
+            elif param in bool_params:
+                writer_options[param] = str(value).lower() == 'true'
+            else:  # color params or text
+                writer_options[param] = value
+
+    return writer_options
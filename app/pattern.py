@@ -0,0 +1,100 @@
+"""
+Module-pattern output for the Barcode Generator API.
+
+This module provides a python-barcode writer that, instead of drawing, walks
+the encoded module sequence and records it in a compact run-length form along
+with the human readable text positions and the geometry the raster writers
+would use. Browsers can then draw the barcode themselves, so no Pillow work
+is done on the server.
+"""
+
+from barcode.writer import BaseWriter, mm2px, pt2mm
+
+
+def run_length_encode(line):
+    """
+    Run-length encode one line of a barcode module sequence.
+
+    Runs alternate bar/space and always start with a bar, so a line that
+    starts with a space gets a leading zero-length bar.
+
+    Args:
+        line: Module string as produced by ``Barcode.build()`` ('1', '0', 'G')
+
+    Returns:
+        tuple: (runs, guards)
+               - runs: List of run lengths in modules
+               - guards: Indices of runs that are extended guard bars
+    """
+    runs = []
+    guards = []
+    previous = '0'
+    for module in line:
+        if runs and module == previous:
+            runs[-1] += 1
+            continue
+        # Keep bar/space alternation when a run can't start here
+        if (module == '0') == (previous == '0'):
+            runs.append(0)
+        runs.append(1)
+        if module == 'G':
+            guards.append(len(runs) - 1)
+        previous = module
+    return runs, guards
+
+
+class PatternWriter(BaseWriter):
+    """Writer that returns the module pattern and geometry instead of an image."""
+
+    def __init__(self, dpi=300):
+        BaseWriter.__init__(
+            self, self._init, self._paint_module, self._paint_text, self._finish
+        )
+        self.dpi = dpi
+        self._code = []
+        self._texts = []
+        self._size = (0, 0)
+
+    def _init(self, code):
+        self._code = code
+        self._texts = []
+        self._size = self.calculate_size(len(code[0]), len(code))
+
+    def _paint_module(self, xpos, ypos, width, color):
+        # Modules are sent as runs; the client paints them
+        pass
+
+    def _paint_text(self, xpos, ypos):
+        for subtext in self.text.split("\n"):
+            self._texts.append({"text": subtext, "x": round(xpos, 3), "y": round(ypos, 3)})
+            ypos += pt2mm(self.font_size) / 2 + self.text_line_distance
+
+    def _finish(self):
+        lines = []
+        for line in self._code:
+            runs, guards = run_length_encode(line)
+            lines.append({"runs": runs, "guards": guards})
+
+        width, height = self._size
+        return {
+            "lines": lines,
+            "modules": len(self._code[0]),
+            "text": self._texts,
+            "geometry": {
+                "unit": "mm",
+                "dpi": self.dpi,
+                "width": round(width, 3),
+                "height": round(height, 3),
+                "width_px": int(mm2px(width, self.dpi)),
+                "height_px": int(mm2px(height, self.dpi)),
+                "module_width": self.module_width,
+                "module_height": self.module_height,
+                "quiet_zone": self.quiet_zone,
+                "margin_top": self.margin_top,
+                "guard_height_factor": self.guard_height_factor,
+                "font_size": self.font_size,
+                "text_distance": self.text_distance,
+            },
+            "background": self.background,
+            "foreground": self.foreground,
+        }
@@ -0,0 +1,421 @@
+"""
+Cache-affinity front router for the Barcode Generator API.
+
+Each API instance keeps its own render and compression caches, so spreading
+requests round-robin over several instances divides the hit rate by the
+number of instances. This router hashes the canonical (type, data, options)
+key of every ``/barcode`` request onto a consistent-hash ring of backends,
+so the same barcode always lands on the same instance. Other requests go to
+the least loaded backend.
+
+Consistent hashing with bounded loads keeps one hot key from overloading
+its backend: a backend that already holds more than (1 + epsilon) times the
+average load is skipped and the next backend on the ring takes the request.
+Backends are health checked in the background and the ring is rebuilt when
+one joins or leaves, which only moves the keys of that backend.
+
+A backend that can't be connected to is taken off the ring at once and the
+request goes to the next one. A backend that accepted a request but is slow
+or fails is left on the ring. The request is not retried, because it may
+still be rendering; the client gets 504 or 502.
+
+Only plain HTTP is proxied. WebSocket upgrades, such as streaming sessions
+on ``/barcode/stream``, are refused with 501 and must connect to an API
+instance directly.
+"""
+
+import os
+import math
+import socket
+import bisect
+import hashlib
+import threading
+import http.client
+from urllib.parse import parse_qs
+
+from .app_logging import SimpleLogger
+from .cache import cache_key
+from .options import parse_writer_options
+
+# Headers that only apply to a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+}
+
+
+# Errors of a keep-alive connection the backend closed while it was idle
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class BackendUnavailable(Exception):
+    """Raised when no connection to a backend can be opened."""
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Immutable consistent-hash ring with virtual nodes."""
+
+    def __init__(self, backends, vnodes=160):
+        """
+        Args:
+            backends: Backend names ('host:port') on the ring
+            vnodes: Virtual nodes per backend; more gives a more even spread
+        """
+        self.backends = sorted(backends)
+        points = sorted(
+            (_hash(f'{backend}#{replica}'), backend)
+            for backend in self.backends
+            for replica in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [backend for _, backend in points]
+
+    def __len__(self):
+        return len(self.backends)
+
+    def walk(self, key):
+        """Yield each backend once, in ring order starting at the key's position."""
+        if not self._nodes:
+            return
+        start = bisect.bisect(self._hashes, _hash(key)) % len(self._nodes)
+        seen = set()
+        for offset in range(len(self._nodes)):
+            backend = self._nodes[(start + offset) % len(self._nodes)]
+            if backend not in seen:
+                seen.add(backend)
+                yield backend
+                if len(seen) == len(self.backends):
+                    return
+
+
+class BackendPool:
+    """Tracks backend health and load and picks a backend per request."""
+
+    def __init__(self, specs, vnodes=None, load_factor=None, health_interval=None,
+                 health_path='/', failure_threshold=None):
+        """
+        Args:
+            specs: Backend addresses as 'host:port'. Host names are resolved on
+                   every health check, so a name resolving to several replicas
+                   adds all of them.
+            vnodes: Virtual nodes per backend (default: ROUTER_VNODES or 160)
+            load_factor: Bounded-load epsilon; a backend takes at most
+                         (1 + epsilon) times the average load
+                         (default: ROUTER_LOAD_FACTOR or 0.25)
+            health_interval: Seconds between health checks
+                             (default: ROUTER_HEALTH_INTERVAL or 5)
+            health_path: Path requested to check a backend (default: '/')
+            failure_threshold: Consecutive failed checks before a backend is
+                               taken off the ring (default: ROUTER_HEALTH_FAILURES or 2)
+        """
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.specs = specs
+        self.vnodes = vnodes or int(os.environ.get('ROUTER_VNODES', 160))
+        self.load_factor = load_factor or float(os.environ.get('ROUTER_LOAD_FACTOR', 0.25))
+        self.health_interval = health_interval or float(os.environ.get('ROUTER_HEALTH_INTERVAL', 5))
+        self.health_path = health_path
+        self.failure_threshold = failure_threshold or int(os.environ.get('ROUTER_HEALTH_FAILURES', 2))
+
+        self.ring = HashRing([], self.vnodes)
+        self.load = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def resolve(self):
+        """Resolve the configured specs to the set of 'ip:port' backends."""
+        backends = set()
+        for spec in self.specs:
+            host, _, port = spec.rpartition(':')
+            try:
+                for info in socket.getaddrinfo(host, int(port), type=socket.SOCK_STREAM):
+                    address = info[4][0]
+                    if ':' in address:
+                        address = f'[{address}]'
+                    backends.add(f'{address}:{port}')
+            except socket.gaierror as e:
+                self.logger.warning(f"Could not resolve backend {spec}: {str(e)}")
+        return backends
+
+    def check(self, backend):
+        """Return True if the backend answers its health check."""
+        host, _, port = backend.rpartition(':')
+        conn = http.client.HTTPConnection(host.strip('[]'), int(port), timeout=2)
+        try:
+            conn.request('GET', self.health_path)
+            return conn.getresponse().status == 200
+        except (OSError, http.client.HTTPException):
+            return False
+        finally:
+            conn.close()
+
+    def refresh(self):
+        """Run one round of health checks and rebuild the ring if membership changed."""
+        candidates = self.resolve()
+        healthy = set()
+        for backend in candidates:
+            if self.check(backend):
+                self._failures[backend] = 0
+                healthy.add(backend)
+                continue
+            self._failures[backend] = self._failures.get(backend, 0) + 1
+            # Keep a backend that is on the ring until it fails repeatedly
+            if backend in self.ring.backends and self._failures[backend] < self.failure_threshold:
+                healthy.add(backend)
+
+        with self._lock:
+            if healthy == set(self.ring.backends):
+                return
+            joined = healthy - set(self.ring.backends)
+            left = set(self.ring.backends) - healthy
+            self.ring = HashRing(healthy, self.vnodes)
+            for backend in joined:
+                self.load.setdefault(backend, 0)
+
+        for backend in sorted(joined):
+            self.logger.info(f"Backend joined: {backend}")
+        for backend in sorted(left):
+            self.logger.warning(f"Backend left: {backend}")
+
+    def mark_down(self, backend):
+        """Take a backend off the ring right away after a failed proxy attempt."""
+        with self._lock:
+            if backend not in self.ring.backends:
+                return
+            self.ring = HashRing(set(self.ring.backends) - {backend}, self.vnodes)
+            self._failures[backend] = self.failure_threshold
+        self.logger.warning(f"Backend left after a failed request: {backend}")
+
+    def start(self):
+        """Check backends once, then keep checking them in a background thread."""
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name='router-health', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"Health check round failed: {str(e)}", exc_info=True)
+
+    def acquire(self, key=None, exclude=()):
+        """
+        Pick a backend and count the request against its load.
+
+        Args:
+            key: Affinity key; None picks the least loaded backend
+            exclude: Backends that already failed for this request
+
+        Returns:
+            str: The chosen backend, or None if no backend is available
+        """
+        with self._lock:
+            backends = [backend for backend in self.ring.backends if backend not in exclude]
+            if not backends:
+                return None
+
+            if key is None:
+                choice = min(backends, key=lambda backend: self.load.get(backend, 0))
+            else:
+                # Bounded load: no backend takes more than (1 + epsilon) x the average
+                total = sum(self.load.get(backend, 0) for backend in backends) + 1
+                capacity = math.ceil(total * (1 + self.load_factor) / len(backends))
+                choice = None
+                for backend in self.ring.walk(key):
+                    if backend in exclude:
+                        continue
+                    if self.load.get(backend, 0) < capacity:
+                        choice = backend
+                        break
+
+            self.load[choice] = self.load.get(choice, 0) + 1
+            return choice
+
+    def release(self, backend):
+        with self._lock:
+            self.load[backend] = max(0, self.load.get(backend, 0) - 1)
+
+
+def affinity_key(path, query_string):
+    """
+    Return the canonical cache key of a barcode request, or None.
+
+    Requests for the same barcode map to the same key regardless of option
+    order, 'raw' or 'format', since backends cache the rendered PNG itself.
+    """
+    if path != '/barcode':
+        return None
+    params = {name: values[0] for name, values in parse_qs(query_string).items()}
+    data = params.get('data')
+    if not data:
+        return None
+    return cache_key(params.get('type', 'code128').lower(), data, parse_writer_options(params))
+
+
+class RouterApp:
+    """WSGI application that proxies requests to the backend chosen by BackendPool."""
+
+    def __init__(self, pool, timeout=None, retries=1):
+        """
+        Args:
+            pool: The BackendPool to route over
+            timeout: Backend response timeout in seconds
+                     (default: ROUTER_TIMEOUT or 30)
+            retries: Extra backends tried when a backend can't be reached
+        """
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.pool = pool
+        self.timeout = timeout or float(os.environ.get('ROUTER_TIMEOUT', 30))
+        self.retries = retries
+        self._local = threading.local()
+
+    def _send(self, backend, method, target, body, headers):
+        """
+        Send a request to a backend and return its response.
+
+        Raises:
+            BackendUnavailable: If no connection to the backend can be opened
+            OSError, http.client.HTTPException: If the backend fails or times
+                out once it has the request, which may still be running
+        """
+        # Keep-alive connections per thread and backend
+        connections = self._local.__dict__.setdefault('connections', {})
+        conn = connections.get(backend)
+        if conn is not None:
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                return conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                # The backend closed an idle keep-alive connection before
+                # reading the request; anything else, e.g. a timeout, means
+                # the request reached it and is not sent again
+                self._discard(backend)
+
+        host, _, port = backend.rpartition(':')
+        conn = http.client.HTTPConnection(host.strip('[]'), int(port), timeout=self.timeout)
+        try:
+            conn.connect()
+        except OSError as e:
+            conn.close()
+            raise BackendUnavailable(str(e)) from e
+        connections[backend] = conn
+        conn.request(method, target, body=body, headers=headers)
+        return conn.getresponse()
+
+    def _discard(self, backend):
+        conn = self._local.__dict__.get('connections', {}).pop(backend, None)
+        if conn is not None:
+            conn.close()
+
+    def _forward_headers(self, environ):
+        headers = {}
+        for name, value in environ.items():
+            if name.startswith('HTTP_'):
+                header = name[5:].replace('_', '-').title()
+                if header.lower() not in HOP_BY_HOP_HEADERS and header.lower() != 'host':
+                    headers[header] = value
+        if environ.get('CONTENT_TYPE'):
+            headers['Content-Type'] = environ['CONTENT_TYPE']
+
+        client_ip = environ.get('REMOTE_ADDR', '')
+        forwarded = headers.get('X-Forwarded-For')
+        headers['X-Forwarded-For'] = f'{forwarded}, {client_ip}' if forwarded else client_ip
+        headers['Host'] = environ.get('HTTP_HOST', '')
+        return headers
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '/')
+        query_string = environ.get('QUERY_STRING', '')
+        target = path + (f'?{query_string}' if query_string else '')
+
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else None
+        headers = self._forward_headers(environ)
+        key = affinity_key(path, query_string) if method == 'GET' else None
+
+        if environ.get('HTTP_UPGRADE', '').lower() == 'websocket':
+            # A WSGI server can't hand the connection over; streaming
+            # sessions connect to an ASGI instance directly
+            start_response('501 Not Implemented', [('Content-Type', 'application/json')])
+            return [b'{"error": "WebSocket upgrades are not proxied, connect to an API instance directly"}']
+
+        tried = []
+        while len(tried) <= self.retries:
+            backend = self.pool.acquire(key, exclude=tried)
+            if backend is None:
+                break
+            try:
+                response = self._send(backend, method, target, body, headers)
+            except BackendUnavailable as e:
+                # Nothing reached the backend, so the request is safe to retry
+                self.logger.warning(f"Backend {backend} unreachable: {str(e)}")
+                self.pool.release(backend)
+                self.pool.mark_down(backend)
+                tried.append(backend)
+                # Only idempotent requests are retried on another backend
+                if method not in ('GET', 'HEAD'):
+                    break
+                continue
+            except (OSError, http.client.HTTPException) as e:
+                # The backend has the request; a slow or failed render is not
+                # a dead backend, and retrying would only multiply the load
+                self._discard(backend)
+                self.pool.release(backend)
+                if isinstance(e, TimeoutError):
+                    self.logger.warning(f"Backend {backend} timed out after {self.timeout}s")
+                    start_response('504 Gateway Timeout', [('Content-Type', 'application/json'), ('X-Backend', backend)])
+                    return [b'{"error": "Backend timed out"}']
+                self.logger.warning(f"Backend {backend} failed: {str(e)}")
+                start_response('502 Bad Gateway', [('Content-Type', 'application/json'), ('X-Backend', backend)])
+                return [b'{"error": "Backend failed"}']
+
+            response_headers = [
+                (name, value) for name, value in response.getheaders()
+                if name.lower() not in HOP_BY_HOP_HEADERS
+            ]
+            response_headers.append(('X-Backend', backend))
+            start_response(f'{response.status} {response.reason}', response_headers)
+            return self._stream(backend, response)
+
+        start_response('503 Service Unavailable', [('Content-Type', 'application/json')])
+        return [b'{"error": "No healthy backend available"}']
+
+    def _stream(self, backend, response):
+        completed = False
+        try:
+            while True:
+                chunk = response.read(65536)
+                if not chunk:
+                    break
+                yield chunk
+            completed = True
+        finally:
+            # A partially read response leaves the connection unusable
+            if not completed or response.will_close:
+                self._discard(backend)
+            self.pool.release(backend)
+
+
+def create_router(backends=None):
+    """
+    Create the router WSGI app and start health checking its backends.
+
+    Args:
+        backends: Backend addresses as 'host:port'
+                  (default: comma separated ROUTER_BACKENDS)
+    """
+    if backends is None:
+        backends = [spec.strip() for spec in os.environ.get('ROUTER_BACKENDS', '').split(',') if spec.strip()]
+    pool = BackendPool(backends)
+    pool.start()
+    return RouterApp(pool)
@@ -0,0 +1,229 @@
+"""
+Streaming render sessions for the Barcode Generator API.
+
+Scanner and print stations request a barcode every few hundred milliseconds
+all day long. Over plain HTTP every one of those requests pays for request
+parsing, routing, logging and headers. A streaming session is a single
+WebSocket at ``/barcode/stream`` over which the client sends render requests
+as JSON text frames and receives the rendered barcodes as binary frames.
+
+Requests are pipelined: up to ``window`` renders run at once per session and
+results are sent as soon as they are ready, tagged with the request's id so
+the client can match them up. When the window is full the server stops
+reading, which pushes back on the client.
+
+Request frame (text)::
+
+    {"id": "42", "data": "TEST123", "type": "code128", "format": "png", "options": {...}, "timeout_ms": 2000}
+
+A request that waits longer than its ``timeout_ms`` (capped by
+REQUEST_TIMEOUT_MS) is dropped with an error frame instead of rendered, and
+work still queued when the client disconnects is dropped silently.
+
+Result frame (binary)::
+
+    2-byte big-endian header length | JSON header | image bytes
+
+    header: {"id": "42", "content_type": "image/png", "degraded": false}
+
+Error frame (text)::
+
+    {"id": "42", "error": "..."}
+"""
+
+import os
+import json
+import time
+import struct
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from .app_logging import SimpleLogger
+from .deadline import Deadline
+from .options import parse_writer_options
+
+STREAM_PATH = '/barcode/stream'
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+def encode_frame(header, content):
+    """Pack a result header and its image bytes into one binary frame."""
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return struct.pack('>H', len(header_bytes)) + header_bytes + content
+
+
+class StreamSession:
+    """One WebSocket session rendering pipelined barcode requests."""
+
+    def __init__(self, scope, receive, send, executor, window):
+        self.logger = SimpleLogger(self.__class__.__name__)
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.executor = executor
+        self.window = window
+        self.rendered = 0
+        self.failed = 0
+        self.deadlines = set()
+        self._send_lock = asyncio.Lock()
+
+    async def _send(self, message):
+        # ASGI sends must not interleave
+        async with self._send_lock:
+            await self.send(message)
+
+    def _render(self, request, deadline):
+        """Render one request; runs in the executor."""
+        from .blueprints.barcode import barcode_generator, brownout
+
+        deadline.check('queue')
+
+        data = request.get('data')
+        barcode_type = str(request.get('type', 'code128')).lower()
+        output_format = str(request.get('format', 'png')).lower()
+
+        if not isinstance(data, str) or not data:
+            raise ValueError("'data' must be a non-empty string")
+        if barcode_type not in barcode_generator.SUPPORTED_TYPES:
+            raise ValueError(f"Unsupported barcode type: {barcode_type}")
+        if output_format not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported stream format: {output_format}")
+
+        writer_options = parse_writer_options(request.get('options') or {})
+
+        brownout.request_started()
+        start = time.perf_counter()
+        try:
+            if output_format == 'svg':
+                return barcode_generator.generate_svg(data, barcode_type, deadline, **writer_options), False
+            result = barcode_generator.generate_barcode(
+                data, barcode_type, True, degraded=brownout.is_degraded(), deadline=deadline, **writer_options
+            )
+            return result['content'], result['degraded']
+        finally:
+            brownout.request_finished((time.perf_counter() - start) * 1000)
+
+    async def _handle(self, text, received, slots):
+        request_id = None
+        try:
+            request = json.loads(text)
+            if not isinstance(request, dict):
+                raise ValueError("Request frames must be JSON objects")
+            request_id = request.get('id')
+            deadline = Deadline.from_header(request.get('timeout_ms'), received)
+            self.deadlines.add(deadline)
+
+            loop = asyncio.get_running_loop()
+            try:
+                content, degraded = await loop.run_in_executor(self.executor, self._render, request, deadline)
+            finally:
+                self.deadlines.discard(deadline)
+
+            header = {
+                'id': request_id,
+                'content_type': CONTENT_TYPES[str(request.get('format', 'png')).lower()],
+                'degraded': degraded,
+            }
+            await self._send({'type': 'websocket.send', 'bytes': encode_frame(header, content)})
+            self.rendered += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            try:
+                await self._send({'type': 'websocket.send', 'text': json.dumps({'id': request_id, 'error': str(e)})})
+            except Exception:
+                # The client is gone; nothing left to report to
+                pass
+        finally:
+            slots.release()
+
+    async def run(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+        await self._send({'type': 'websocket.accept'})
+
+        client = self.scope.get('client') or ('-', 0)
+        started = time.perf_counter()
+        self.logger.info(f"Stream session opened from {client[0]} with window {self.window}")
+
+        slots = asyncio.Semaphore(self.window)
+        tasks = set()
+        try:
+            while True:
+                # Stop reading while the window is full
+                await slots.acquire()
+                message = await self.receive()
+
+                if message['type'] == 'websocket.disconnect':
+                    slots.release()
+                    break
+                if message['type'] != 'websocket.receive':
+                    slots.release()
+                    continue
+
+                text = message.get('text')
+                if text is None:
+                    text = (message.get('bytes') or b'').decode('utf-8', errors='replace')
+
+                task = asyncio.ensure_future(self._handle(text, time.monotonic(), slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            # Results can't be delivered once the client has gone; renders
+            # already handed to the executor stop at their next checkpoint
+            for deadline in list(self.deadlines):
+                deadline.cancel()
+            for task in tasks:
+                task.cancel()
+
+        self.logger.info(
+            f"Stream session from {client[0]} closed after {time.perf_counter() - started:.1f}s: "
+            f"{self.rendered} rendered, {self.failed} failed"
+        )
+
+
+class StreamingApp:
+    """ASGI app serving stream sessions and passing everything else through."""
+
+    def __init__(self, fallback, path=STREAM_PATH, threads=None, default_window=None, max_window=None):
+        """
+        Args:
+            fallback: ASGI app for all other requests (the wrapped Flask app)
+            path: WebSocket path of the stream endpoint
+            threads: Render threads shared by all sessions
+                     (default: STREAM_THREADS or CPU count)
+            default_window: In-flight renders per session when the client
+                            doesn't ask (default: STREAM_WINDOW or 8)
+            max_window: Largest window a client may ask for
+                        (default: STREAM_MAX_WINDOW or 64)
+        """
+        self.fallback = fallback
+        self.path = path
+        self.default_window = default_window or int(os.environ.get('STREAM_WINDOW', 8))
+        self.max_window = max_window or int(os.environ.get('STREAM_MAX_WINDOW', 64))
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or int(os.environ.get('STREAM_THREADS', os.cpu_count() or 1)),
+            thread_name_prefix='barcode-stream'
+        )
+
+    def _window(self, scope):
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        try:
+            window = int(query.get('window', [self.default_window])[0])
+        except ValueError:
+            window = self.default_window
+        return max(1, min(window, self.max_window))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'websocket' and scope['path'] == self.path:
+            session = StreamSession(scope, receive, send, self.executor, self._window(scope))
+            await session.run()
+            return
+        await self.fallback(scope, receive, send)
@@ -2,7 +2,11 @@
 ASGI entry point for the Barcode Generator API.
 
 This module serves as the ASGI entry point for running the application
-using Uvicorn or other ASGI servers.
+using Uvicorn or other ASGI servers. Besides the wrapped Flask app it
+serves streaming render sessions over WebSocket at /barcode/stream, which
+needs a WebSocket capable server (``pip install uvicorn[standard]``).
+Requests get their deadline on arrival and renders of clients that
+disconnect are cancelled (see app.deadline).
 """
 import os
 import socket
@@ -13,10 +17,12 @@ from tabulate import tabulate
 from uvicorn.middleware.wsgi import WSGIMiddleware
 from wsgi import Colors, get_config, print_banner
 from app import create_app
+from app.streaming import StreamingApp
+from app.deadline import DeadlineMiddleware
 
 # Create WSGI app and wrap it with ASGI middleware
 wsgi_app = create_app()
-app = WSGIMiddleware(wsgi_app)
+app = StreamingApp(DeadlineMiddleware(WSGIMiddleware(wsgi_app)))
 
 
 def get_system_info(host: str, port: int, debug: bool) -> List[Tuple[str, str]]:
@@ -41,6 +47,8 @@ def get_system_info(host: str, port: int, debug: bool) -> List[Tuple[str, str]]:
         ("Host", f"{host}:{port}"),
         ("Local URL", f"{Colors.BLUE}http://127.0.0.1:{port}{Colors.RESET}"),
         ("Network URL", f"{Colors.BLUE}http://{ip_address}:{port}{Colors.RESET}"),
+        ("Stream URL", f"{Colors.BLUE}ws://127.0.0.1:{port}{app.path}{Colors.RESET}"),
+        ("Stream Window", f"{app.default_window} (max {app.max_window})"),
         ("Hostname", hostname),
         ("IP Address", ip_address),
         ("OS", f"{platform.system()} {platform.release()}")
@@ -0,0 +1,121 @@
+"""
+Benchmark the optimal Code 128 encoder against python-barcode's encoder.
+
+For a set of realistic payloads this compares the number of modules in the
+symbol and the time to render a PNG, and checks that both symbols decode to
+the same data.
+
+Usage:
+    python benchmarks/bench_code128.py [iterations]
+"""
+import os
+import sys
+import time
+from io import BytesIO
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from barcode.codex import Code128
+from barcode.charsets import code128
+from barcode.writer import ImageWriter
+
+from app.code128 import OptimalCode128
+
+PAYLOADS = [
+    ("SSCC", "00340123450000000018"),
+    ("Order number", "ORDER-2024-000123"),
+    ("Lot + expiry", "LOT12345678EXP20251231"),
+    ("Odd numeric run", "A1234567B"),
+    ("Short numeric", "1234567"),
+    ("Tracking number", "1Z999AA10123456784"),
+    ("Path-like", "shipment/abc/9876543210"),
+    ("Serial", "SN-00042-XK9"),
+    ("Control chars", "ab\tcd\tef"),
+    ("Alphanumeric", "TEST123"),
+    ("Odd trailing digits", "PALLET12345"),
+    ("GS1 element strings", "\xf10109501101530003\xf110ABC123"),
+]
+
+
+def decode(encoded):
+    """Decode Code 128 code words (start code first, no checksum) to text."""
+    by_value = {name: {v: k for k, v in table.items()} for name, table in (("A", code128.A), ("B", code128.B), ("C", code128.C))}
+    start = {v: k for k, v in code128.START_CODES.items()}
+    charset = start[encoded[0]]
+    text = ""
+    shift = False
+    for value in encoded[1:]:
+        current = charset
+        if shift:
+            current = "B" if charset == "A" else "A"
+            shift = False
+        if current == "C":
+            if value < 100:
+                text += f"{value:02d}"
+            elif value == code128.C["TO_A"]:
+                charset = "A"
+            elif value == code128.C["TO_B"]:
+                charset = "B"
+            else:
+                text += by_value["C"][value]
+            continue
+        name = by_value[current][value]
+        if name == "SHIFT":
+            shift = True
+        elif name.startswith("TO_"):
+            charset = name[-1]
+        else:
+            text += name
+    return text
+
+
+def modules(barcode_class, data):
+    return len(barcode_class(data).build()[0])
+
+
+def render_time(barcode_class, data, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        buffer = BytesIO()
+        barcode_class(data, writer=ImageWriter()).write(buffer)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rows = []
+    totals = [0, 0, 0.0, 0.0]
+
+    for label, data in PAYLOADS:
+        library_encoded = Code128(data).encoded
+        optimal_encoded = OptimalCode128(data).encoded
+        assert decode(library_encoded) == data, f"library encoding of {data!r} doesn't round-trip"
+        assert decode(optimal_encoded) == data, f"optimal encoding of {data!r} doesn't round-trip"
+
+        library_modules = modules(Code128, data)
+        optimal_modules = modules(OptimalCode128, data)
+        library_ms = render_time(Code128, data, iterations)
+        optimal_ms = render_time(OptimalCode128, data, iterations)
+
+        totals[0] += library_modules
+        totals[1] += optimal_modules
+        totals[2] += library_ms
+        totals[3] += optimal_ms
+        rows.append((label, repr(data), library_modules, optimal_modules,
+                     f"{library_ms:.3f}", f"{optimal_ms:.3f}"))
+
+    rows.append(("Total", "", totals[0], totals[1], f"{totals[2]:.3f}", f"{totals[3]:.3f}"))
+    print(tabulate(
+        rows,
+        headers=["Payload", "Data", "Modules (library)", "Modules (optimal)",
+                 "Render ms (library)", "Render ms (optimal)"],
+        tablefmt="grid",
+    ))
+    print(f"\nAll payloads decode to the same data. "
+          f"Modules saved: {totals[0] - totals[1]} ({(1 - totals[1] / totals[0]) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark template compositing against ImageWriter for retail barcodes.
+
+For each barcode type and a few option sets this renders random codes both
+ways, checks that the images are identical pixel for pixel, and compares the
+time to draw the image and to produce the final PNG.
+
+Usage:
+    python benchmarks/bench_compositing.py [codes]
+"""
+import os
+import sys
+import time
+import random
+from io import BytesIO
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import barcode
+from barcode.writer import ImageWriter
+from PIL import ImageChops
+
+from app.compositing import TemplateCompositor
+
+TYPES = [
+    ("ean13", 12, ""),
+    ("ean8", 7, ""),
+    ("upc", 11, ""),
+    ("isbn13", 9, "978"),
+    ("issn", 7, ""),
+]
+
+OPTION_SETS = [
+    ("Defaults", {}),
+    ("No text", {"write_text": False}),
+    ("Large", {"module_width": 0.33, "module_height": 25.0, "font_size": 14, "quiet_zone": 3.0}),
+    ("Colors", {"foreground": "#1a237e", "background": "#fff8e1", "center_text": False}),
+]
+
+
+def random_codes(digits, prefix, count, seed=1):
+    rng = random.Random(seed)
+    return [prefix + "".join(rng.choice("0123456789") for _ in range(digits)) for _ in range(count)]
+
+
+def writer_for(options):
+    # Same setup as BarcodeGenerator._render_png
+    writer = ImageWriter()
+    for key, value in options.items():
+        if hasattr(writer, key):
+            setattr(writer, key, value)
+    return writer
+
+
+def encode(image):
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = []
+    mismatches = 0
+
+    for barcode_type, digits, prefix in TYPES:
+        barcode_class = barcode.get_barcode_class(barcode_type)
+        codes = random_codes(digits, prefix, count)
+        for label, options in OPTION_SETS:
+            compositor = TemplateCompositor()
+            # The first render builds the template and the first sight of
+            # each digit fills its glyph table; time the steady state
+            for code in codes:
+                compositor.render(barcode_type, barcode_class(code, writer=writer_for(options)), options)
+
+            start = time.perf_counter()
+            expected = [barcode_class(code, writer=writer_for(options)).render(options) for code in codes]
+            writer_ms = (time.perf_counter() - start) / count * 1000
+
+            start = time.perf_counter()
+            actual = [compositor.render(barcode_type, barcode_class(code, writer=writer_for(options)), options) for code in codes]
+            template_ms = (time.perf_counter() - start) / count * 1000
+
+            for code, want, got in zip(codes, expected, actual):
+                if want.size != got.size or ImageChops.difference(want.convert('RGB'), got.convert('RGB')).getbbox():
+                    mismatches += 1
+                    print(f"Mismatch: {barcode_type} {label} {code}")
+
+            start = time.perf_counter()
+            for image in expected:
+                encode(image)
+            encode_ms = (time.perf_counter() - start) / count * 1000
+
+            rows.append((
+                barcode_type, label, f"{writer_ms:.3f}", f"{template_ms:.3f}",
+                f"{writer_ms / template_ms:.1f}x",
+                f"{writer_ms + encode_ms:.3f}", f"{template_ms + encode_ms:.3f}",
+            ))
+
+    print(tabulate(
+        rows,
+        headers=["Type", "Options", "Draw ms (writer)", "Draw ms (template)", "Draw speedup",
+                 "PNG ms (writer)", "PNG ms (template)"],
+        tablefmt="grid",
+    ))
+    if mismatches:
+        print(f"\n{mismatches} images differ from ImageWriter")
+        sys.exit(1)
+    print(f"\nAll {count * len(TYPES) * len(OPTION_SETS)} images are identical to ImageWriter's.")
+
+
+if __name__ == "__main__":
+    main()
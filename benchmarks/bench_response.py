@@ -0,0 +1,119 @@
+"""
+Benchmark the response pipeline of /barcode against the previous one.
+
+The previous pipeline base64-encoded every PNG, raw responses included, and
+built the data URI with an f-string from a decoded copy. The current one
+only base64-encodes for JSON and hands raw PNG bytes to the server by
+reference. For cached barcodes (the steady state) this compares the time per
+response and the peak memory allocated while building it, measured with
+tracemalloc, up to the body the WSGI server sends.
+
+Usage:
+    python benchmarks/bench_response.py [iterations]
+"""
+import os
+import sys
+import time
+import base64
+import tracemalloc
+from contextlib import redirect_stdout
+
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import jsonify, make_response
+
+from app import create_app
+from app.blueprints.barcode import barcode_generator, image_response
+
+PAYLOADS = [
+    ("Short", "TEST123", {}),
+    ("Long", "1Z999AA10123456784-SHIPMENT-0042", {}),
+    ("Large modules", "1Z999AA10123456784-SHIPMENT-0042", {"module_width": 0.6, "module_height": 40.0}),
+]
+
+
+def legacy_response(data, raw, writer_options):
+    """The /barcode response as built before the zero-copy pipeline."""
+    result = barcode_generator.generate_barcode(data, 'code128', True, **writer_options)
+    content = result['content']
+    b64_barcode = base64.b64encode(content).decode('utf-8')
+    if raw:
+        response = make_response(content)
+        response.headers.set('Content-Type', 'image/png')
+        response.headers.set('Content-Disposition', 'attachment; filename=barcode_code128.png')
+        return response
+    return jsonify({
+        'barcode_type': 'code128',
+        'data': data,
+        'barcode': f"data:image/png;base64,{b64_barcode}",
+        'options': writer_options,
+    })
+
+
+def current_response(data, raw, writer_options):
+    """The /barcode response as built now."""
+    result = barcode_generator.generate_barcode(data, 'code128', raw, **writer_options)
+    if raw:
+        return image_response(result['content'], result['content_type'], result['filename'])
+    return jsonify(result)
+
+
+def send(response):
+    """Collect the body the way a WSGI server would."""
+    chunks = []
+    environ = {'REQUEST_METHOD': 'GET', 'SERVER_PROTOCOL': 'HTTP/1.1'}
+    for chunk in response(environ, lambda status, headers: None):
+        chunks.append(chunk)
+    return sum(len(chunk) for chunk in chunks)
+
+
+def measure(build, data, raw, writer_options, iterations):
+    """Return (microseconds per response, peak bytes allocated per response, body size)."""
+    size = send(build(data, raw, writer_options))
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        send(build(data, raw, writer_options))
+    elapsed_us = (time.perf_counter() - start) / iterations * 1e6
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(min(iterations, 20)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        send(build(data, raw, writer_options))
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return elapsed_us, peak, size
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = create_app()
+
+    rows = []
+    # The generator logs every request; keep that out of the table
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), app.test_request_context('/barcode', environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        for label, data, writer_options in PAYLOADS:
+            png_size = len(barcode_generator.generate_barcode(data, 'code128', True, **writer_options)['content'])
+            for raw in (True, False):
+                legacy_us, legacy_peak, _ = measure(legacy_response, data, raw, writer_options, iterations)
+                current_us, current_peak, size = measure(current_response, data, raw, writer_options, iterations)
+                rows.append((
+                    label, png_size, "raw" if raw else "json", size,
+                    f"{legacy_us:.1f}", f"{current_us:.1f}",
+                    legacy_peak, current_peak,
+                ))
+
+    print(tabulate(
+        rows,
+        headers=["Payload", "PNG bytes", "Response", "Body bytes", "µs (before)", "µs (now)",
+                 "Peak alloc (before)", "Peak alloc (now)"],
+        tablefmt="grid",
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Front router entry point for the Barcode Generator API.
+
+This module runs the cache-affinity router in front of several API
+instances. Backends are given as a comma separated ROUTER_BACKENDS list of
+'host:port' entries; a host name that resolves to several replicas adds all
+of them. Run it with Gunicorn as a single threaded process
+(``gunicorn -w 1 -k gthread --threads 64 router:app``) so one process sees
+the load of every request.
+"""
+import os
+from typing import List, Tuple
+
+from tabulate import tabulate
+from werkzeug.serving import run_simple
+
+from app import Colors
+from app.router import create_router
+
+# Create router instance for WSGI servers
+app = create_router()
+
+
+def get_router_info(host: str, port: int) -> List[Tuple[str, str]]:
+    """
+    Collect the router settings.
+
+    Args:
+        host: The host address the router is running on
+        port: The port number the router is running on
+
+    Returns:
+        List of tuples containing (setting_name, setting_value)
+    """
+    pool = app.pool
+    return [
+        ("Server", f"{Colors.GREEN}Cache-Affinity Router{Colors.RESET}"),
+        ("Host", f"{host}:{port}"),
+        ("Backends", ", ".join(pool.specs) or f"{Colors.RED}none configured{Colors.RESET}"),
+        ("Healthy", ", ".join(pool.ring.backends) or f"{Colors.YELLOW}none yet{Colors.RESET}"),
+        ("Load Factor", f"{pool.load_factor}"),
+        ("Health Interval", f"{pool.health_interval}s"),
+    ]
+
+
+def print_router_info(host: str, port: int) -> None:
+    """
+    Print the router settings in a formatted table.
+
+    Args:
+        host: The host address the router is running on
+        port: The port number the router is running on
+    """
+    print(f"\n{Colors.CYAN}{'=' * 60}")
+    print(f"{'ROUTER'.center(60)}")
+    print(f"{'=' * 60}{Colors.RESET}")
+
+    print(tabulate(
+        get_router_info(host, port),
+        headers=["Setting", "Value"],
+        tablefmt="grid",
+        stralign="left",
+        showindex=False,
+        maxcolwidths=[None, 50]
+    ))
+
+    print(f"{Colors.CYAN}{'=' * 60}{Colors.RESET}\n")
+
+
+def main() -> None:
+    """Main entry point for the router."""
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("ROUTER_PORT", 8080))
+
+    print_router_info(host, port)
+    print(f"{Colors.GREEN}➤ Starting router...{Colors.RESET}\n")
+    run_simple(host, port, app, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
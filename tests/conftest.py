@@ -0,0 +1,34 @@
+"""Shared fixtures for the Barcode Generator API tests."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.blueprints import barcode as barcode_blueprint
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Keep the job store of the jobs blueprint out of the working tree
+    monkeypatch.setenv('JOB_DB_PATH', str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setenv('JOB_ARTIFACT_DIR', str(tmp_path / 'jobs'))
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def generator():
+    """The module-level generator with an empty render cache."""
+    generator = barcode_blueprint.barcode_generator
+    generator.cache = type(generator.cache)(max_entries=generator.cache.max_entries,
+                                            max_bytes=generator.cache.max_bytes)
+    return generator
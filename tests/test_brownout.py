@@ -0,0 +1,132 @@
+"""Tests for brownout control and the cache-only JSON rule while degraded."""
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.blueprints import barcode as barcode_blueprint
+from app.brownout import BrownoutController
+
+
+@pytest.fixture
+def degraded(monkeypatch):
+    """Put the barcode routes in brownout for the duration of a test."""
+    controller = BrownoutController(max_in_flight=1000, latency_ms=1e9, min_duration=3600)
+    controller.enabled = True
+    controller.active = True
+    monkeypatch.setattr(barcode_blueprint, 'brownout', controller)
+    return controller
+
+
+def test_enters_on_in_flight_and_recovers_with_hysteresis(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('app.brownout.time.monotonic', lambda: clock[0])
+    controller = BrownoutController(max_in_flight=4, latency_ms=500, recovery_ratio=0.5, min_duration=10)
+    controller.enabled = True
+
+    for _ in range(4):
+        controller.request_started()
+    assert controller.is_degraded()
+
+    # Below the threshold but not below the recovery level: still degraded
+    controller.request_finished(10)
+    clock[0] += 60
+    controller.request_started()
+    controller.request_finished(10)
+    assert controller.in_flight == 3
+    assert controller.is_degraded()
+
+    controller.request_finished(10)
+    assert controller.in_flight == 2
+    assert not controller.is_degraded()
+
+
+def test_stays_degraded_for_min_duration(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('app.brownout.time.monotonic', lambda: clock[0])
+    controller = BrownoutController(max_in_flight=1, latency_ms=500, min_duration=10)
+    controller.enabled = True
+
+    controller.request_started()
+    controller.request_finished(10)
+    assert controller.is_degraded()
+
+    clock[0] += 10
+    controller.request_started()
+    controller.request_finished(10)
+    assert not controller.is_degraded()
+
+
+def test_enters_on_latency():
+    controller = BrownoutController(max_in_flight=100, latency_ms=50, smoothing=1.0)
+    controller.enabled = True
+    controller.request_started()
+    controller.request_finished(80)
+    assert controller.is_degraded()
+
+
+def test_uncached_json_refused_while_degraded(client, generator, degraded):
+    response = client.get('/barcode?data=UNCACHED1')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(int(degraded.min_duration))
+    assert response.headers['X-Barcode-Degraded'] == 'true'
+    assert response.json['degraded'] is True
+
+
+def test_cached_json_served_in_full_while_degraded(client, generator, monkeypatch):
+    assert client.get('/barcode?data=CACHED1').status_code == 200
+
+    controller = BrownoutController(min_duration=3600)
+    controller.enabled = controller.active = True
+    monkeypatch.setattr(barcode_blueprint, 'brownout', controller)
+
+    response = client.get('/barcode?data=CACHED1')
+    assert response.status_code == 200
+    assert response.json['degraded'] is False
+    assert 'X-Barcode-Degraded' not in response.headers
+
+
+def test_raw_rendered_cheaply_and_then_served_as_json(client, generator, degraded):
+    response = client.get('/barcode?data=RAW1&raw=true')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.headers['X-Barcode-Degraded'] == 'true'
+
+    # The degraded render is now cached, so JSON can be served from it
+    response = client.get('/barcode?data=RAW1')
+    assert response.status_code == 200
+    assert response.json['degraded'] is True
+    assert response.json['options']['write_text'] is False
+
+
+def test_uncached_variants_refused_while_degraded(client, generator, degraded):
+    response = client.get('/barcode/variants?data=VARIANTS1&variants=1x,2x,600dpi,1200dpi')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(int(degraded.min_duration))
+    assert response.headers['X-Barcode-Degraded'] == 'true'
+
+
+def test_cached_variants_served_while_degraded(client, generator, monkeypatch):
+    url = '/barcode/variants?data=VARIANTS2&variants=1x,2x'
+    rendered = client.get(url)
+    assert rendered.status_code == 200
+
+    controller = BrownoutController(min_duration=3600)
+    controller.enabled = controller.active = True
+    monkeypatch.setattr(barcode_blueprint, 'brownout', controller)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.json['variants'] == rendered.json['variants']
+
+    # One size missing from the cache is enough to refuse the set
+    assert client.get('/barcode/variants?data=VARIANTS2&variants=1x,3x').status_code == 503
+
+
+@pytest.mark.parametrize('barcode_type,data', [('code128', 'TEST1'), ('ean13', '590123412345')])
+@pytest.mark.parametrize('foreground,background', [('blue', 'white'), ('#333333', '#fff8e1'), ('black', 'white')])
+def test_degraded_render_keeps_coloured_bars(generator, barcode_type, data, foreground, background):
+    png = generator._render_png(data, barcode_type, True, {'foreground': foreground, 'background': background})
+    image = Image.open(BytesIO(png))
+    assert image.mode == '1'
+    assert sorted(color for _, color in image.getcolors()) == [0, 255]
@@ -0,0 +1,98 @@
+"""Tests for the optimal Code 128 encoder."""
+import random
+
+import pytest
+from barcode.charsets import code128
+from barcode.codex import Code128
+
+from app.code128 import OptimalCode128, encode
+
+FNC1 = '\xf1'
+
+PAYLOADS = [
+    '00340123450000000018',         # SSCC, all digits
+    'A1234567B',                    # odd digit run between letters
+    '1234567',                      # odd digits only
+    'PALLET12345',                  # odd trailing digits
+    '12345ABC',                     # odd leading digits
+    'ORDER-2024-000123',
+    '1Z999AA10123456784',
+    'shipment/abc/9876543210',
+    'ab\tcd\tef',                   # control characters in lower case text: SHIFT
+    'AB\x00cd\x1fEF',
+    'x\ny',
+    FNC1 + '0109501101530003' + FNC1 + '10ABC123',  # GS1 with FNC1
+    FNC1 + '123',
+    'TEST123',
+]
+
+
+def decode(encoded):
+    """Decode Code 128 code words (start code first, no checksum) to text."""
+    by_value = {name: {v: k for k, v in table.items()}
+                for name, table in (('A', code128.A), ('B', code128.B), ('C', code128.C))}
+    charset = {v: k for k, v in code128.START_CODES.items()}[encoded[0]]
+    text = ''
+    shift = False
+    for value in encoded[1:]:
+        current = charset
+        if shift:
+            current = 'B' if charset == 'A' else 'A'
+            shift = False
+        if current == 'C':
+            if value < 100:
+                text += f'{value:02d}'
+            elif value == code128.C['TO_A']:
+                charset = 'A'
+            elif value == code128.C['TO_B']:
+                charset = 'B'
+            else:
+                text += by_value['C'][value]
+            continue
+        name = by_value[current][value]
+        if name == 'SHIFT':
+            shift = True
+        elif name.startswith('TO_'):
+            charset = name[-1]
+        else:
+            text += name
+    return text
+
+
+def random_payloads(count, seed=128):
+    rng = random.Random(seed)
+    alphabet = '0123456789' * 4 + 'ABCXYZabcxyz-/ ' + '\t\n\x00\x1f' + FNC1
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 30))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('data', PAYLOADS + random_payloads(2000))
+def test_round_trip_and_never_longer_than_library(data):
+    encoded = encode(data)
+    assert decode(encoded) == data
+    assert len(encoded) <= len(Code128(data).encoded)
+
+
+def test_saves_code_words_on_odd_trailing_digits():
+    assert len(encode('PALLET12345')) < len(Code128('PALLET12345').encoded)
+
+
+def test_empty_payload_is_just_a_start_code():
+    assert encode('') == [code128.START_CODES['B']]
+
+
+def test_control_character_uses_shift():
+    encoded = encode('ab\tcd')
+    assert code128.A['SHIFT'] in encoded
+    assert decode(encoded) == 'ab\tcd'
+
+
+def test_symbol_builds_with_checksum():
+    symbol = OptimalCode128('A1234567B')
+    assert symbol.build()[0] == symbol.build()[0]
+    assert set(symbol.build()[0]) <= {'0', '1'}
+    assert len(symbol.build()[0]) <= len(Code128('A1234567B').build()[0])
+
+
+def test_unencodable_character_rejected():
+    with pytest.raises(ValueError):
+        encode('é')
@@ -0,0 +1,58 @@
+"""Tests that template compositing matches ImageWriter pixel for pixel."""
+import random
+
+import barcode
+import pytest
+from barcode.writer import ImageWriter
+
+from app.compositing import TemplateCompositor
+
+TYPES = [
+    ("ean13", 12, ""),
+    ("ean8", 7, ""),
+    ("upc", 11, ""),
+    ("isbn13", 9, "978"),
+    ("issn", 7, ""),
+]
+
+OPTION_SETS = [
+    {},
+    {"write_text": False},
+    {"center_text": False},
+    {"module_width": 0.33, "module_height": 25.0, "font_size": 14, "quiet_zone": 3.0},
+    {"foreground": "#1a237e", "background": "#fff8e1", "center_text": False},
+]
+
+
+def writer_for(options, mode):
+    # Same setup as BarcodeGenerator._render_png
+    writer = ImageWriter(mode=mode)
+    for key, value in options.items():
+        if hasattr(writer, key):
+            setattr(writer, key, value)
+    return writer
+
+
+def not_rendered(options):
+    raise AssertionError("expected the barcode to be composited from its template")
+
+
+@pytest.mark.parametrize('mode', ['RGB', 'L'])
+@pytest.mark.parametrize('options', OPTION_SETS)
+@pytest.mark.parametrize('barcode_type,digits,prefix', TYPES)
+def test_template_matches_imagewriter(barcode_type, digits, prefix, options, mode):
+    barcode_class = barcode.get_barcode_class(barcode_type)
+    rng = random.Random(barcode_type)
+    codes = [prefix + "".join(rng.choice("0123456789") for _ in range(digits)) for _ in range(6)]
+    compositor = TemplateCompositor()
+
+    # The first render builds the template, the rest are composited from it
+    compositor.render(barcode_type, barcode_class(codes[0], writer=writer_for(options, mode)), options)
+    for code in codes[1:]:
+        expected = barcode_class(code, writer=writer_for(options, mode)).render(options)
+        instance = barcode_class(code, writer=writer_for(options, mode))
+        instance.render = not_rendered
+        actual = compositor.render(barcode_type, instance, options)
+
+        assert (actual.mode, actual.size) == (expected.mode, expected.size)
+        assert actual.tobytes() == expected.tobytes(), f"{barcode_type} {code} {options}"
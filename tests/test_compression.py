@@ -0,0 +1,85 @@
+"""Tests for response compression negotiation and the variant cache."""
+import gzip
+import json
+
+import pytest
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from app.blueprints import barcode as barcode_blueprint
+from app.compression import ResponseCompressor
+
+
+@pytest.fixture
+def compressor(monkeypatch):
+    """A fresh shared compressor, so cache counters start at zero."""
+    compressor = ResponseCompressor()
+    monkeypatch.setattr(barcode_blueprint, 'response_compressor', compressor)
+    return compressor
+
+
+def accept(header):
+    return parse_accept_header(header, Accept)
+
+
+def test_default_levels_suit_dynamic_content(monkeypatch):
+    for name in ('COMPRESS_GZIP_LEVEL', 'COMPRESS_BR_LEVEL', 'COMPRESS_ZSTD_LEVEL'):
+        monkeypatch.delenv(name, raising=False)
+    assert ResponseCompressor().levels == {'gzip': 6, 'br': 5, 'zstd': 3}
+
+
+def test_negotiates_best_supported_encoding():
+    compressor = ResponseCompressor()
+    assert accept('gzip, unknown;q=1').best_match(compressor.encodings) == 'gzip'
+    assert accept('identity').best_match(compressor.encodings) is None
+    # The server's preference order breaks ties
+    assert accept('gzip, br, zstd').best_match(compressor.encodings) == compressor.encodings[0]
+
+
+def test_repeated_body_cached_after_second_request():
+    compressor = ResponseCompressor()
+    body = b'{"a": "' + b'x' * 2000 + b'"}'
+    assert gzip.decompress(compressor.get_variant(body, 'gzip')) == body
+    assert len(compressor._cache) == 0
+
+    second = compressor.get_variant(body, 'gzip')
+    assert len(compressor._cache) == 1
+    assert compressor.get_variant(body, 'gzip') is second
+    assert compressor._cache.hits == 1
+
+
+def test_json_barcode_compressed(client, compressor, generator):
+    response = client.get('/barcode?data=TEST123', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'"barcode_type"' in gzip.decompress(response.data)
+
+
+def test_json_barcode_fresh_in_every_encoding(client, compressor, generator):
+    stamps = []
+    for encoding in ('gzip', 'identity', 'gzip'):
+        response = client.get('/barcode?data=TEST123', headers={'Accept-Encoding': encoding})
+        body = gzip.decompress(response.data) if encoding == 'gzip' else response.data
+        stamps.append(json.loads(body)['generated_at'])
+    # Each request's own timestamp, and one-off bodies stay out of the cache
+    assert len(set(stamps)) == 3
+    assert len(compressor._cache) == 0
+
+
+def test_form_page_compressed_once_it_repeats(client, compressor):
+    for _ in range(3):
+        response = client.get('/barcode', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(compressor._cache) == 1
+    assert compressor._cache.hits == 1
+
+
+def test_png_and_identity_left_alone(client, compressor, generator):
+    response = client.get('/barcode?data=TEST123&raw=true', headers={'Accept-Encoding': 'gzip'})
+    assert response.mimetype == 'image/png'
+    assert 'Content-Encoding' not in response.headers
+
+    response = client.get('/barcode?data=TEST123', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.json['barcode_type'] == 'code128'
@@ -0,0 +1,116 @@
+"""Tests for request deadlines, their checkpoints and DeadlineMiddleware."""
+import time
+import asyncio
+
+import pytest
+
+from app import deadline as deadlines
+from app.deadline import Deadline, DeadlineExceeded, DeadlineMiddleware, TOKEN_HEADER
+
+
+class ExpiresBefore(Deadline):
+    """Deadline that runs out just as the request reaches `stage`."""
+
+    def __init__(self, stage):
+        super().__init__(60000)
+        self.stage = stage
+
+    def check(self, stage):
+        if stage == self.stage:
+            self.expires_at = time.monotonic()
+        super().check(stage)
+
+
+def hand_over(deadline, token='test-token'):
+    """Register `deadline` the way DeadlineMiddleware does and return its header."""
+    with deadlines._pending_lock:
+        deadlines._pending[token] = deadline
+    return {TOKEN_HEADER: token}
+
+
+def run_middleware(headers, messages, app):
+    """Run one HTTP request through DeadlineMiddleware around the ASGI `app`."""
+    async def request():
+        incoming = asyncio.Queue()
+        for message in messages:
+            await incoming.put(message)
+
+        async def send(message):
+            pass
+
+        scope = {'type': 'http', 'path': '/barcode', 'headers': headers}
+        await asyncio.wait_for(DeadlineMiddleware(app)(scope, incoming.get, send), 5)
+
+    asyncio.run(request())
+
+
+@pytest.mark.parametrize('value', [None, '', 'soon', '-250', '0', 'nan', 'inf'])
+def test_invalid_timeout_falls_back_to_default(monkeypatch, value):
+    monkeypatch.setenv('REQUEST_TIMEOUT_MS', '2000')
+    assert Deadline.from_header(value, start=100.0).expires_at == pytest.approx(102.0)
+
+
+def test_client_timeout_capped_by_default(monkeypatch):
+    monkeypatch.setenv('REQUEST_TIMEOUT_MS', '2000')
+    assert Deadline.from_header('500', start=100.0).expires_at == pytest.approx(100.5)
+    assert Deadline.from_header('9000', start=100.0).expires_at == pytest.approx(102.0)
+
+
+@pytest.mark.parametrize('stage', ['queue', 'render', 'encode'])
+def test_expired_deadline_answers_504_and_is_counted(client, generator, stage):
+    before = client.get('/barcode/metrics').json['deadlines']
+
+    response = client.get(f'/barcode?data=DEADLINE-{stage}&raw=true', headers=hand_over(ExpiresBefore(stage)))
+    assert response.status_code == 504
+    assert response.json['stage'] == stage
+
+    after = client.get('/barcode/metrics').json['deadlines']
+    assert after['dropped'][stage]['expired'] == before['dropped'][stage]['expired'] + 1
+    assert after['total_dropped'] == before['total_dropped'] + 1
+
+
+def test_cancelled_deadline_answers_499(client, generator):
+    deadline = Deadline(60000)
+    deadline.cancel()
+    response = client.get('/barcode?data=GONE&raw=true', headers=hand_over(deadline))
+    assert response.status_code == 499
+    assert response.json['stage'] == 'queue'
+
+
+def test_disconnect_cancels_deadline():
+    seen = {}
+
+    async def app(scope, receive, send):
+        token = dict(scope['headers'])[TOKEN_HEADER.lower().encode('latin-1')].decode('latin-1')
+        seen['deadline'] = deadline = deadlines.claim_deadline(token)
+        await receive()
+        # The render is still running when the client hangs up
+        while not deadline._cancelled.is_set():
+            await asyncio.sleep(0.01)
+
+    run_middleware([], [{'type': 'http.request', 'body': b''}, {'type': 'http.disconnect'}], app)
+
+    with pytest.raises(DeadlineExceeded) as error:
+        seen['deadline'].check('render')
+    assert (error.value.reason, error.value.status_code) == ('disconnected', 499)
+
+
+def test_forged_token_dropped():
+    planted = Deadline(60000)
+    hand_over(planted, token='forged')
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen['tokens'] = [value for name, value in scope['headers'] if name == TOKEN_HEADER.lower().encode('latin-1')]
+
+    try:
+        run_middleware(
+            [(b'x-deadline-token', b'forged'), (b'x-request-timeout-ms', b'500')],
+            [{'type': 'http.request', 'body': b''}],
+            app,
+        )
+        assert len(seen['tokens']) == 1 and seen['tokens'] != [b'forged']
+        # The planted deadline is never handed to the request, and the issued one is cleaned up
+        assert deadlines._pending == {'forged': planted}
+    finally:
+        deadlines.claim_deadline('forged')
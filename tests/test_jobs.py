@@ -0,0 +1,109 @@
+"""Tests for job chunk rendering, retries and recovery from a broken render pool."""
+import os
+import json
+import time
+import zipfile
+import threading
+
+import pytest
+
+from app import jobs
+from app.jobs import JobStore, JobDispatcher, render_chunk, MAX_CHUNK_ATTEMPTS
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.sqlite3'), str(tmp_path / 'jobs'))
+
+
+def chunk_row(store, job_id, chunk=0):
+    conn = store._connect()
+    try:
+        return dict(conn.execute(
+            'SELECT * FROM job_chunks WHERE job_id = ? AND chunk = ?', (job_id, chunk)
+        ).fetchone())
+    finally:
+        conn.close()
+
+
+def test_render_chunk_reports_invalid_items(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, '_generator', None)
+    rendered, errors = render_chunk(
+        str(tmp_path), 0, 'ean13', {}, [(0, '590123412345'), (1, 'not-a-number'), (2, '400638133393')]
+    )
+    assert rendered == 2
+    assert [error['index'] for error in errors] == [1]
+    assert errors[0]['data'] == 'not-a-number'
+
+    with zipfile.ZipFile(os.path.join(str(tmp_path), 'part-000000.zip')) as part:
+        assert len(part.namelist()) == 2
+    # Batch renders stay out of the interactive render cache
+    assert len(jobs._generator.cache) == 0
+
+
+def test_claim_respects_priority_and_concurrency(store):
+    low = store.create_job('code128', ['a'] * 4, priority=0, max_concurrency=2, chunk_size=1)
+    high = store.create_job('code128', ['b'] * 4, priority=5, max_concurrency=1, chunk_size=1)
+
+    claimed = store.claim_chunks(3)
+    assert [chunk['job_id'] for chunk in claimed] == [high, low, low]
+    assert store.get_job(high)['status'] == jobs.RUNNING
+
+
+def test_crashed_chunk_retried_then_failed(store):
+    job_id = store.create_job('code128', ['a', 'b', 'c'], chunk_size=3)
+
+    for attempt in range(1, MAX_CHUNK_ATTEMPTS + 1):
+        [chunk] = store.claim_chunks(1)
+        assert chunk_row(store, job_id)['attempts'] == attempt
+        store.retry_or_fail_chunk(job_id, chunk['chunk'], 'Render process died')
+
+    row = chunk_row(store, job_id)
+    assert row['status'] == jobs.DONE
+    assert len(json.loads(row['errors'])) == 3
+    assert store.get_job(job_id)['failed'] == 3
+    assert store.jobs_ready_to_assemble() == [job_id]
+
+
+def test_completed_chunk_updates_progress(store):
+    job_id = store.create_job('code128', ['a', 'b', 'c', 'd'], chunk_size=2, max_concurrency=2)
+    chunks = store.claim_chunks(2)
+    store.complete_chunk(job_id, chunks[0]['chunk'], 2, [])
+    store.complete_chunk(job_id, chunks[1]['chunk'], 1, [{'index': 3, 'data': 'd', 'error': 'bad'}])
+
+    job = store.get_job(job_id)
+    assert (job['completed'], job['failed'], job['progress']) == (3, 1, 1.0)
+    assert store.chunk_errors(job_id) == [{'index': 3, 'data': 'd', 'error': 'bad'}]
+
+
+def crash_once(job_dir, chunk, barcode_type, options, items):
+    """render_chunk stand-in whose first call kills its render process."""
+    marker = os.path.join(os.path.dirname(job_dir), 'crashed')
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return render_chunk(job_dir, chunk, barcode_type, options, items)
+
+
+def test_dispatcher_survives_dead_render_process(store, monkeypatch):
+    monkeypatch.setattr(jobs, 'render_chunk', crash_once)
+    job_id = store.create_job('code128', ['TEST1', 'TEST2'], chunk_size=1, max_concurrency=2)
+
+    dispatcher = JobDispatcher(store, workers=2, poll_interval=0.05)
+    thread = threading.Thread(target=dispatcher.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 60
+        while store.get_job(job_id)['status'] in (jobs.QUEUED, jobs.RUNNING):
+            assert time.monotonic() < deadline, "job did not finish after the pool broke"
+            time.sleep(0.05)
+    finally:
+        dispatcher.stop()
+        thread.join(30)
+
+    assert os.path.exists(os.path.join(store.artifact_dir, 'crashed'))
+    job = store.get_job(job_id)
+    assert job['status'] == jobs.COMPLETED
+    assert (job['completed'], job['failed']) == (2, 0)
+    with zipfile.ZipFile(job['artifact']) as archive:
+        assert len(archive.namelist()) == 2
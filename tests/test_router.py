@@ -0,0 +1,250 @@
+"""Tests for the cache-affinity router."""
+import io
+import os
+import socket
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.router import HashRing, BackendPool, BackendUnavailable, RouterApp, affinity_key
+
+BACKENDS = ['10.0.0.1:8000', '10.0.0.2:8000', '10.0.0.3:8000', '10.0.0.4:8000']
+
+
+@pytest.fixture
+def pool():
+    pool = BackendPool(list(BACKENDS), vnodes=160, load_factor=0.25)
+    pool.ring = HashRing(BACKENDS, pool.vnodes)
+    return pool
+
+
+def test_affinity_key_is_canonical():
+    key = affinity_key('/barcode', 'data=ABC&module_width=0.30&font_size=12&type=CODE128')
+    assert key == affinity_key('/barcode', 'font_size=12&type=code128&module_width=0.3&data=ABC&raw=true')
+    assert key != affinity_key('/barcode', 'data=ABC&module_width=0.4&font_size=12')
+    assert affinity_key('/barcode', 'type=ean13') is None
+    assert affinity_key('/jobs', 'data=ABC') is None
+
+
+def test_affinity_key_does_not_load_render_stack():
+    # The router process should only need the option parser
+    code = (
+        "import sys\n"
+        "from app.router import affinity_key\n"
+        "affinity_key('/barcode', 'data=X&module_width=0.3')\n"
+        "print(','.join(m for m in ('PIL', 'barcode', 'app.blueprints.barcode') if m in sys.modules))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == ''
+
+
+def test_ring_is_stable_and_moves_only_the_leaving_backends_keys():
+    keys = [f'key-{n}' for n in range(2000)]
+    ring = HashRing(BACKENDS)
+    before = {key: next(ring.walk(key)) for key in keys}
+    assert before == {key: next(HashRing(reversed(BACKENDS)).walk(key)) for key in keys}
+
+    smaller = HashRing(BACKENDS[:-1])
+    for key, backend in before.items():
+        if backend != BACKENDS[-1]:
+            assert next(smaller.walk(key)) == backend
+
+    # Every backend gets a reasonable share
+    shares = [list(before.values()).count(backend) for backend in BACKENDS]
+    assert min(shares) > len(keys) / len(BACKENDS) / 2
+
+
+def test_walk_yields_each_backend_once():
+    assert sorted(HashRing(BACKENDS).walk('anything')) == sorted(BACKENDS)
+
+
+def test_same_key_same_backend(pool):
+    key = affinity_key('/barcode', 'data=ABC')
+    first = pool.acquire(key)
+    pool.release(first)
+    for _ in range(10):
+        backend = pool.acquire(key)
+        pool.release(backend)
+        assert backend == first
+
+
+def test_bounded_load_spills_hot_key(pool):
+    key = affinity_key('/barcode', 'data=HOT')
+    chosen = [pool.acquire(key) for _ in range(40)]
+
+    # No backend holds more than (1 + epsilon) x its share
+    assert max(pool.load.values()) <= 40 * 1.25 / len(BACKENDS) + 1
+    # The key's own backend stays the busiest; the rest spill along the ring
+    assert chosen.count(chosen[0]) == max(chosen.count(backend) for backend in chosen)
+    assert len(set(chosen)) > 1
+
+
+def test_exclude_and_unkeyed_requests(pool):
+    key = affinity_key('/barcode', 'data=ABC')
+    home = pool.acquire(key)
+    pool.release(home)
+    assert pool.acquire(key, exclude=[home]) != home
+
+    pool.load = {backend: 5 for backend in BACKENDS}
+    pool.load[BACKENDS[2]] = 1
+    assert pool.acquire() == BACKENDS[2]
+
+    pool.ring = HashRing([])
+    assert pool.acquire(key) is None
+
+
+class FakeResponse:
+    status = 200
+    reason = 'OK'
+    will_close = False
+
+    def __init__(self, body):
+        self._body = io.BytesIO(body)
+
+    def getheaders(self):
+        return [('Content-Type', 'text/plain'), ('Connection', 'keep-alive')]
+
+    def read(self, size):
+        return self._body.read(size)
+
+
+def call(app, path, query='', **environ):
+    environ = dict({
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.input': io.BytesIO(),
+    }, **environ)
+    result = {}
+
+    def start_response(status, headers):
+        result['status'] = status
+        result['headers'] = dict(headers)
+
+    result['body'] = b''.join(app(environ, start_response))
+    return result
+
+
+def test_router_proxies_to_key_owner_and_fails_over(pool, monkeypatch):
+    app = RouterApp(pool, retries=1)
+    down = set()
+    sent = []
+
+    def send(backend, method, target, body, headers):
+        if backend in down:
+            raise BackendUnavailable('Connection refused')
+        sent.append((backend, target, headers))
+        return FakeResponse(b'ok')
+
+    monkeypatch.setattr(app, '_send', send)
+
+    first = call(app, '/barcode', 'data=ABC&raw=true')
+    second = call(app, '/barcode', 'raw=false&data=ABC')
+    assert first['status'].startswith('200') and first['body'] == b'ok'
+    assert first['headers']['X-Backend'] == second['headers']['X-Backend']
+    assert 'Connection' not in first['headers']
+    assert sent[0][2]['X-Forwarded-For'] == '127.0.0.1'
+    assert all(load == 0 for load in pool.load.values())
+
+    down.add(first['headers']['X-Backend'])
+    third = call(app, '/barcode', 'data=ABC')
+    assert third['status'].startswith('200')
+    assert third['headers']['X-Backend'] != first['headers']['X-Backend']
+    assert first['headers']['X-Backend'] not in pool.ring.backends
+
+
+def test_router_refuses_websocket_upgrades(pool):
+    result = call(RouterApp(pool), '/barcode/stream', HTTP_UPGRADE='websocket', HTTP_CONNECTION='Upgrade')
+    assert result['status'].startswith('501')
+    assert b'WebSocket' in result['body']
+
+
+class Backend:
+    """A real local HTTP backend that waits `delay` seconds before answering /barcode."""
+
+    def __init__(self, delay=0.0):
+        backend = self
+        self.requests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                backend.requests += 1
+                if self.path.startswith('/barcode'):
+                    threading.Event().wait(delay)
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Length', '2')
+                    self.end_headers()
+                    self.wfile.write(b'ok')
+                except OSError:
+                    # The router gave up waiting
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.address = f'127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def unused_address():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'127.0.0.1:{sock.getsockname()[1]}'
+
+
+def pool_of(*backends):
+    pool = BackendPool(list(backends), vnodes=160, load_factor=0.25)
+    pool.ring = HashRing(backends, pool.vnodes)
+    return pool
+
+
+def test_unreachable_backend_ejected_and_request_retried():
+    alive = Backend()
+    dead = unused_address()
+    try:
+        pool = pool_of(alive.address, dead)
+        data = next(f'D{n}' for n in range(1000)
+                    if next(pool.ring.walk(affinity_key('/barcode', f'data=D{n}'))) == dead)
+
+        result = call(RouterApp(pool, timeout=2), '/barcode', f'data={data}')
+        assert result['status'].startswith('200')
+        assert result['headers']['X-Backend'] == alive.address
+        assert dead not in pool.ring.backends
+    finally:
+        alive.close()
+
+
+def test_slow_backend_times_out_without_ejection_or_retry():
+    slow = Backend(delay=1.0)
+    other = Backend()
+    try:
+        pool = pool_of(slow.address, other.address)
+        data = next(f'S{n}' for n in range(1000)
+                    if next(pool.ring.walk(affinity_key('/barcode', f'data=S{n}'))) == slow.address)
+        app = RouterApp(pool, timeout=0.3, retries=1)
+
+        # Warm a keep-alive connection, so the timeout happens on a reused one
+        assert app._send(slow.address, 'GET', '/', None, {}).read() == b'ok'
+        slow.requests = 0
+
+        result = call(app, '/barcode', f'data={data}')
+        assert result['status'].startswith('504')
+        assert result['headers']['X-Backend'] == slow.address
+        # Sent once, to one backend, and the backend stays on the ring
+        assert (slow.requests, other.requests) == (1, 0)
+        assert sorted(pool.ring.backends) == sorted([slow.address, other.address])
+        assert all(load == 0 for load in pool.load.values())
+    finally:
+        slow.close()
+        other.close()
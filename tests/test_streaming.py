@@ -0,0 +1,87 @@
+"""Tests for WebSocket streaming sessions, driven by a fake ASGI client."""
+import json
+import struct
+import asyncio
+
+from app.streaming import StreamingApp, encode_frame
+
+
+def run_session(app, frames, query=b''):
+    """Send `frames` over one session and return everything the server sent."""
+    sent = []
+
+    async def session():
+        incoming = asyncio.Queue()
+        await incoming.put({'type': 'websocket.connect'})
+        for frame in frames:
+            await incoming.put({'type': 'websocket.receive', 'text': json.dumps(frame)})
+
+        async def receive():
+            if incoming.empty():
+                # Hang up once every request has been answered
+                while len([m for m in sent if m['type'] == 'websocket.send']) < len(frames):
+                    await asyncio.sleep(0.01)
+                return {'type': 'websocket.disconnect'}
+            return await incoming.get()
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'websocket', 'path': '/barcode/stream', 'query_string': query, 'client': ('127.0.0.1', 1)}
+        await asyncio.wait_for(app(scope, receive, send), 30)
+
+    asyncio.run(session())
+    return sent
+
+
+def decode_frame(frame):
+    (length,) = struct.unpack('>H', frame[:2])
+    return json.loads(frame[2:2 + length]), frame[2 + length:]
+
+
+def test_encode_frame_round_trip():
+    header, content = decode_frame(encode_frame({'id': '1'}, b'png'))
+    assert header == {'id': '1'} and content == b'png'
+
+
+def test_pipelined_renders_and_errors(generator):
+    app = StreamingApp(None, threads=2, default_window=4)
+    sent = run_session(app, [
+        {'id': 'a', 'data': 'TEST1'},
+        {'id': 'b', 'data': 'TEST2', 'format': 'svg'},
+        {'id': 'c', 'data': 'TEST3', 'type': 'nope'},
+    ])
+
+    assert sent[0] == {'type': 'websocket.accept'}
+    results = {}
+    errors = {}
+    for message in sent[1:]:
+        if 'bytes' in message:
+            header, content = decode_frame(message['bytes'])
+            results[header['id']] = (header, content)
+        else:
+            error = json.loads(message['text'])
+            errors[error['id']] = error['error']
+
+    assert results['a'][0]['content_type'] == 'image/png'
+    assert results['a'][1].startswith(b'\x89PNG')
+    assert results['b'][0]['content_type'] == 'image/svg+xml'
+    assert b'<svg' in results['b'][1]
+    assert 'Unsupported barcode type' in errors['c']
+
+
+def test_other_requests_fall_through():
+    calls = []
+
+    async def fallback(scope, receive, send):
+        calls.append(scope['path'])
+
+    asyncio.run(StreamingApp(fallback)({'type': 'http', 'path': '/barcode'}, None, None))
+    assert calls == ['/barcode']
+
+
+def test_window_is_clamped():
+    app = StreamingApp(None, default_window=8, max_window=16)
+    assert app._window({'query_string': b'window=100'}) == 16
+    assert app._window({'query_string': b'window=0'}) == 1
+    assert app._window({'query_string': b'window=abc'}) == 8
@@ -0,0 +1,54 @@
+"""Tests for multi-resolution barcode variants."""
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+
+def decode(variant):
+    return Image.open(BytesIO(base64.b64decode(variant['barcode'].split(',', 1)[1])))
+
+
+def test_variants_match_imagewriter_and_carry_dpi(client, generator):
+    response = client.get('/barcode/variants?data=TEST123&variants=1x,2x,150dpi')
+    assert response.status_code == 200
+    variants = response.json['variants']
+    assert [variant['descriptor'] for variant in variants] == ['1x', '2x', '150dpi']
+
+    for variant in variants:
+        image = decode(variant)
+        assert image.size == (variant['width'], variant['height'])
+        assert tuple(round(value) for value in image.info['dpi']) == (variant['dpi'], variant['dpi'])
+
+    raw = client.get('/barcode?data=TEST123&raw=true')
+    expected = Image.open(BytesIO(raw.data)).convert('RGB')
+    assert list(decode(variants[0]).convert('RGB').getdata()) == list(expected.getdata())
+
+
+def test_variants_cached_per_size(client, generator):
+    client.get('/barcode/variants?data=TEST123&variants=1x,2x')
+    entries = len(generator.cache)
+    client.get('/barcode/variants?data=TEST123&variants=2x,1x')
+    assert len(generator.cache) == entries
+
+
+def test_invalid_variants_rejected(client, generator):
+    assert client.get('/barcode/variants?data=TEST123&variants=5x').status_code == 400
+    assert client.get('/barcode/variants?data=TEST123&variants=big').status_code == 400
+    too_many = ','.join(f'{dpi}dpi' for dpi in range(100, 109))
+    assert client.get('/barcode/variants?data=TEST123&variants=' + too_many).status_code == 400
+
+
+def test_descriptors_normalized_and_deduplicated(client, generator):
+    response = client.get('/barcode/variants?data=TEST123&variants=2X, 2x,1x,1x')
+    assert response.status_code == 200
+    assert [variant['descriptor'] for variant in response.json['variants']] == ['2x', '1x']
+    assert len(generator.cache) == 2
+
+    # Duplicates don't count towards the variant limit
+    response = client.get('/barcode/variants?data=TEST123&variants=' + ','.join(['1x'] * 9))
+    assert [variant['descriptor'] for variant in response.json['variants']] == ['1x']
+
+    # Descriptors drawing the same image share a cache entry
+    client.get('/barcode/variants?data=TEST123&variants=2.0x')
+    assert len(generator.cache) == 2
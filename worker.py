@@ -0,0 +1,77 @@
+"""
+Job worker entry point for the Barcode Generator API.
+
+This module runs the background job dispatcher that renders batches
+submitted to ``POST /jobs``. Run it next to the WSGI/ASGI server, pointing
+both at the same JOB_DB_PATH and JOB_ARTIFACT_DIR.
+"""
+import signal
+from typing import List, Tuple
+
+from tabulate import tabulate
+
+from app import Colors
+from app.jobs import JobDispatcher
+
+
+def get_worker_info(dispatcher: JobDispatcher) -> List[Tuple[str, str]]:
+    """
+    Collect the job worker settings.
+
+    Args:
+        dispatcher: The dispatcher that is about to run
+
+    Returns:
+        List of tuples containing (setting_name, setting_value)
+    """
+    return [
+        ("Server", f"{Colors.GREEN}Job Worker{Colors.RESET}"),
+        ("Render Processes", str(dispatcher.workers)),
+        ("Database", dispatcher.store.db_path),
+        ("Artifacts", dispatcher.store.artifact_dir),
+        ("Poll Interval", f"{dispatcher.poll_interval}s"),
+        ("Retention", f"{dispatcher.retention}s"),
+    ]
+
+
+def print_worker_info(dispatcher: JobDispatcher) -> None:
+    """
+    Print the job worker settings in a formatted table.
+
+    Args:
+        dispatcher: The dispatcher that is about to run
+    """
+    print(f"\n{Colors.CYAN}{'=' * 60}")
+    print(f"{'JOB WORKER'.center(60)}")
+    print(f"{'=' * 60}{Colors.RESET}")
+
+    print(tabulate(
+        get_worker_info(dispatcher),
+        headers=["Setting", "Value"],
+        tablefmt="grid",
+        stralign="left",
+        showindex=False,
+        maxcolwidths=[None, 50]
+    ))
+
+    print(f"{Colors.CYAN}{'=' * 60}{Colors.RESET}\n")
+
+
+def main() -> None:
+    """Main entry point for the job worker."""
+    dispatcher = JobDispatcher()
+
+    # Finish the current poll and exit cleanly on shutdown
+    def handle_signal(signum, frame):
+        dispatcher.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print_worker_info(dispatcher)
+    print(f"{Colors.GREEN}➤ Starting job worker...{Colors.RESET}\n")
+    dispatcher.run()
+
+
+if __name__ == "__main__":
+    main()